@@ -0,0 +1,94 @@
+# benchmarks/calendar_rendering.py
+"""
+Compares calendar PNG rendering strategies on a synthetic multi-term schedule:
+  - fresh:    a new figure per month (plot_calendar_month), one after another,
+  - template: render_calendar_png, reusing one figure per month layout,
+  - parallel: render_calendar_pngs, templates spread over a process pool.
+Also checks that all three produce byte-identical PNGs.
+
+Usage: python benchmarks/calendar_rendering.py [--months 24] [--exams 600] [--workers N]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from scheduler.calendar_utils import (
+    calendar_months,
+    plot_calendar_month,
+    render_calendar_png,
+    render_calendar_pngs,
+)
+
+
+def synthetic_exam_dates(num_months, num_exams, seed=0):
+    """Returns {exam: datetime} with exams spread over roughly `num_months` months."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    span = num_months * 30
+    return {f"EX{i}": start + timedelta(days=rng.randrange(span)) for i in range(num_exams)}
+
+
+def render_fresh(exam_dates):
+    pngs = {}
+    for year, month in calendar_months(exam_dates):
+        fig = plot_calendar_month(exam_dates, year, month)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
+        plt.close(fig)
+        pngs[(year, month)] = buf.getvalue()
+    return pngs
+
+
+def render_template(exam_dates):
+    return {(year, month): render_calendar_png(exam_dates, year, month)
+            for year, month in calendar_months(exam_dates)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--exams", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per strategy; the best time is reported")
+    args = parser.parse_args()
+
+    exam_dates = synthetic_exam_dates(args.months, args.exams, args.seed)
+    print(f"{len(calendar_months(exam_dates))} months, {len(exam_dates)} exams, {args.workers} workers")
+
+    # Warm up font caches and the per-layout templates so the first strategy
+    # timed is not penalised.
+    render_fresh(synthetic_exam_dates(6, 50, args.seed))
+    render_template(synthetic_exam_dates(6, 50, args.seed))
+
+    results = {}
+    for name, render in (
+        ("fresh", render_fresh),
+        ("template", render_template),
+        ("parallel", lambda dates: render_calendar_pngs(dates, workers=args.workers)),
+    ):
+        elapsed = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = render(exam_dates)
+            elapsed = min(elapsed, time.perf_counter() - start)
+        print(f"{name:>9}: {elapsed:7.3f}s ({elapsed / len(results[name]) * 1000:6.1f} ms/month)")
+
+    identical = results["fresh"] == results["template"] == results["parallel"]
+    print(f"byte-identical: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
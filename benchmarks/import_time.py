@@ -0,0 +1,80 @@
+# benchmarks/import_time.py
+"""
+Measures how long importing the app's entry points takes and checks that
+none of them loads the heavy libraries they only need on some code paths.
+
+Each target is imported in a fresh interpreter (best of --repeat runs, after
+one warm-up run that compiles the bytecode). A target fails the check if it
+loads one of its forbidden modules, or takes longer than --max-ms:
+
+  scheduler.scheduler       no pandas / matplotlib / openpyxl / flask
+  scheduler.batch           no pandas / matplotlib / openpyxl / flask
+  scheduler.calendar_utils  no pandas / matplotlib (SVGs and month lists)
+  web app (web/app.py)      no pandas / matplotlib / openpyxl
+
+Usage: python benchmarks/import_time.py [--repeat 5] [--max-ms 800]
+Exits with status 1 if any check fails.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HEAVY = ("pandas", "matplotlib", "openpyxl", "flask")
+# (module, modules it must not load)
+TARGETS = [
+    ("scheduler.scheduler", HEAVY),
+    ("scheduler.batch", HEAVY),
+    ("scheduler.calendar_utils", ("pandas", "matplotlib")),
+    ("app", ("pandas", "matplotlib", "openpyxl")),
+]
+
+# Run in the child: import the target and report the time and what got loaded.
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {watched!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, watched):
+    """Imports `module` in a fresh interpreter; returns {"seconds", "loaded"}."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, "web")]))
+    out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, watched=list(watched))],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=800.0,
+                        help="slowest acceptable import of a target, in milliseconds")
+    args = parser.parse_args()
+
+    failed = False
+    for module, forbidden in TARGETS:
+        watched = sorted(set(HEAVY) | set(forbidden))
+        measure(module, watched)
+        runs = [measure(module, watched) for _ in range(args.repeat)]
+        best = min(run["seconds"] for run in runs) * 1000
+        loaded = sorted(set().union(*(run["loaded"] for run in runs)))
+        bad = [m for m in loaded if m in forbidden]
+        status = "ok"
+        if bad:
+            status = f"FAIL: loads {', '.join(bad)}"
+        elif best > args.max_ms:
+            status = f"FAIL: over {args.max_ms:.0f} ms"
+        failed = failed or status != "ok"
+        print(f"{module:>26}: {best:7.1f} ms  loads [{', '.join(loaded)}]  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# benchmarks/scheduler_suite.py
+"""
+Times every stage of the scheduling pipeline on synthetic registrations
+(see synthetic.py) for a range of sizes and writes the results as JSON.
+
+Stages: generate, write (not part of the app), ingest (read_and_analyze_data),
+index (build_enrollment_index), graph (conflict graph), setup, normal,
+extended, conflict, improve, student_load (schedule_exams_with_options, via
+scheduler.metrics), details (compute_conflict_details) and render
+(generate_calendar_images). Every stage is timed once, so they add up to the
+run's total_seconds. Each size runs in a fresh process so that its peak RSS
+is its own; --trace-memory adds the per-stage peak of Python/NumPy
+allocations (tracemalloc, which slows the timings down).
+
+Usage:
+  python benchmarks/scheduler_suite.py [--sizes 1000,10000,100000,500000] [--output results.json]
+  python benchmarks/scheduler_suite.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+from scheduler.calendar_utils import generate_calendar_images
+from scheduler.enrollment import build_enrollment_index
+from scheduler.metrics import recording
+from scheduler.scheduler import compute_conflict_details, read_and_analyze_data, schedule_exams_with_options
+from synthetic import generate_registrations
+
+DEFAULT_SIZES = "1000,10000,100000,500000"
+FIRST_DATE = datetime(2025, 5, 5)  # a Monday
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+
+def _last_date(num_days):
+    """Returns the date of the `num_days`-th weekday from FIRST_DATE."""
+    day, remaining = FIRST_DATE, num_days
+    while True:
+        if day.weekday() < 5:
+            remaining -= 1
+            if remaining == 0:
+                return day
+        day += timedelta(days=1)
+
+
+class _Stages:
+    """Collects {stage: {"seconds", "peak_rss_mb"[, "traced_peak_mb"]}}."""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.results = {}
+
+    def run(self, name, fn, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.add(name, time.perf_counter() - start)
+        return value
+
+    def add(self, name, seconds):
+        entry = self.results.setdefault(name, {"seconds": 0.0})
+        entry["seconds"] += seconds
+        entry["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+        if self.trace_memory:
+            entry["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+
+
+def run_size(num_registrations, args):
+    """Runs the whole pipeline once and returns the result record for one size."""
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    stages = _Stages(args.trace_memory)
+    last_date = _last_date(args.days)
+
+    data = stages.run("generate", generate_registrations, num_registrations, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"registrations.{args.format}")
+        writers = {"csv": lambda: data.to_csv(path, index=False),
+                   "xlsx": lambda: data.to_excel(path, index=False),
+                   "parquet": lambda: data.to_parquet(path, index=False)}
+        stages.run("write", writers[args.format])
+        del data
+        data = stages.run("ingest", read_and_analyze_data, path)
+
+    index = stages.run("index", build_enrollment_index, data)
+    del data
+    stages.run("graph", lambda: index.conflict_graph)
+
+    with recording() as recorder:
+        solutions = schedule_exams_with_options(index, FIRST_DATE, last_date, [], {},
+                                                improve_seconds=args.improve_seconds)
+    # The scheduler's "index" lap covers building the index from a DataFrame;
+    # it was built above, so what remains is its own setup.
+    for name, seconds in recorder.stages.items():
+        stages.add("setup" if name == "index" else name, seconds)
+
+    conflict_solution = solutions["conflict_solution"]
+    details = stages.run("details", compute_conflict_details, index, conflict_solution["schedule"])
+    if not args.no_render:
+        stages.run("render", generate_calendar_images, solutions["extended_solution"]["schedule"], workers=1)
+
+    if args.trace_memory:
+        tracemalloc.stop()
+    total_seconds = time.perf_counter() - start
+    return {
+        "registrations": int(index.exam_ptr[-1]),
+        "students": index.num_students,
+        "exams": index.num_exams,
+        "days": args.days,
+        "total_seconds": round(total_seconds, 6),
+        "stages": {name: dict(entry, seconds=round(entry["seconds"], 6))
+                   for name, entry in stages.results.items()},
+        "result": {
+            "normal_complete": solutions["normal_complete"],
+            "extended_last_date": solutions["extended_solution"]["extended_last_date"].strftime("%Y-%m-%d"),
+            "total_conflicts": conflict_solution["total_conflicts"],
+            "impacted_students": conflict_solution["impacted_students"],
+            "conflict_rows": len(details),
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    """Prints the per-stage time ratio new/old for the sizes both files contain."""
+    with open(old_path) as f:
+        old = {run["registrations"]: run for run in json.load(f)["runs"]}
+    with open(new_path) as f:
+        new = json.load(f)["runs"]
+    for run in new:
+        before = old.get(run["registrations"])
+        if before is None:
+            continue
+        print(f"{run['registrations']} registrations")
+        for name, entry in run["stages"].items():
+            if name in before["stages"]:
+                was = before["stages"][name]["seconds"]
+                ratio = entry["seconds"] / was if was else float("nan")
+                print(f"  {name:>9}: {was:9.4f}s -> {entry['seconds']:9.4f}s  x{ratio:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated registration counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=15, help="weekdays in the requested exam period")
+    parser.add_argument("--improve-seconds", type=float, default=0.0)
+    parser.add_argument("--format", choices=("csv", "xlsx", "parquet"), default="csv",
+                        help="file format used for the ingest stage")
+    parser.add_argument("--no-render", action="store_true", help="skip the calendar rendering stage")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.single:
+        json.dump(run_size(args.single, args), sys.stdout)
+        return 0
+
+    # Every size runs in its own process so peak RSS is not carried over.
+    flags = [flag for flag, enabled in (("--no-render", args.no_render), ("--trace-memory", args.trace_memory))
+             if enabled]
+    runs = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", str(size),
+                              "--seed", str(args.seed), "--days", str(args.days),
+                              "--improve-seconds", str(args.improve_seconds), "--format", args.format]
+                             + flags,
+                             capture_output=True, text=True, check=True).stdout
+        run = json.loads(out)
+        runs.append(run)
+        timings = "  ".join(f"{name} {entry['seconds']:.3f}s" for name, entry in run["stages"].items())
+        peak = max(entry["peak_rss_mb"] for entry in run["stages"].values())
+        print(f"{run['registrations']:>8} registrations, {run['exams']} exams, peak {peak:.0f} MB, "
+              f"{run['total_seconds']:.3f}s: {timings}")
+
+    commit = _git_commit()
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{commit or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "matplotlib": matplotlib.__version__,
+                "seed": args.seed,
+                "days": args.days,
+                "improve_seconds": args.improve_seconds,
+                "format": args.format,
+            },
+            "runs": runs,
+        }, f, indent=2)
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# benchmarks/synthetic.py
+"""
+Seeded generator of synthetic university registrations with the columns the
+scheduler reads (Student ID, Exam ID, Course Name).
+
+The shape follows a typical enrolment pattern: courses belong to departments
+of DEPARTMENT_SIZE courses, every student is enrolled in a programme (one
+department, with a few large departments and many small ones) and takes 3-7
+courses. Most of a student's courses come from their own department, weighted
+towards the department's core courses; the rest are electives drawn from the
+whole catalogue by course popularity (log-normal), which gives the long tail
+of small and a few very large exams seen in real data.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEPARTMENT_SIZE = 20
+# Share of registrations taken inside the student's own department.
+HOME_SHARE = 0.7
+# Average registrations per student (3-7 courses each).
+COURSES_PER_STUDENT = 5
+# Average students per course; sets the catalogue size for a given volume.
+STUDENTS_PER_COURSE = 75
+
+
+def generate_registrations(num_registrations, seed=0):
+    """
+    Returns a DataFrame of about `num_registrations` unique (student, exam)
+    registrations. The same seed always gives the same data.
+    """
+    rng = np.random.default_rng(seed)
+    # Some draws repeat a course for the same student; the extra students make
+    # up for them and the surplus is sampled away at the end.
+    num_students = max(1, int(num_registrations / COURSES_PER_STUDENT * 1.15))
+    num_courses = max(DEPARTMENT_SIZE, num_registrations // STUDENTS_PER_COURSE)
+    num_departments = -(-num_courses // DEPARTMENT_SIZE)
+
+    # Programme sizes are skewed (Zipf-like), course popularity is log-normal.
+    department_weights = 1.0 / np.arange(1, num_departments + 1) ** 0.8
+    department = rng.choice(num_departments, size=num_students,
+                            p=department_weights / department_weights.sum())
+    popularity = rng.lognormal(0.0, 1.0, num_courses)
+    core_weights = 1.0 / np.arange(1, DEPARTMENT_SIZE + 1)
+
+    per_student = rng.integers(3, 8, size=num_students)
+    students = np.repeat(np.arange(num_students), per_student)
+    home = rng.random(len(students)) < HOME_SHARE
+    courses = np.empty(len(students), dtype=np.int64)
+    courses[home] = department[students[home]] * DEPARTMENT_SIZE + rng.choice(
+        DEPARTMENT_SIZE, size=int(home.sum()), p=core_weights / core_weights.sum())
+    courses[~home] = rng.choice(num_courses, size=int((~home).sum()), p=popularity / popularity.sum())
+    courses %= num_courses
+
+    pairs = np.unique(students * num_courses + courses)
+    if len(pairs) > num_registrations:
+        pairs = np.sort(rng.choice(pairs, size=num_registrations, replace=False))
+    students, courses = np.divmod(pairs, num_courses)
+    # Registration exports are usually not sorted by student.
+    order = rng.permutation(len(pairs))
+    students, courses = students[order], courses[order]
+
+    exam_labels = np.array([f"EX{c}" for c in range(num_courses)], dtype=object)
+    course_labels = np.array([f"Course {c}" for c in range(num_courses)], dtype=object)
+    return pd.DataFrame({
+        "Student ID": students + 100000,
+        "Exam ID": exam_labels[courses],
+        "Course Name": course_labels[courses],
+    })
@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 import calendar
 import matplotlib.pyplot as plt
 
+from scheduler.enrollment import build_enrollment_index
+
 def read_and_analyze_data(filepath):
     data = pd.read_excel(filepath, engine='openpyxl')
     #print("First few rows of the data:")
@@ -32,16 +34,14 @@ def schedule_exams(data, start_date, end_date, excluded_dates, fixed_schedules):
     available_days = find_weekdays(start_date, end_date, excluded_dates)
     
     # --- Build lookups ---
-    exam_students = {}
-    exam_course = {}
-    for exam in data['Exam ID'].unique():
-        subset = data[data['Exam ID'] == exam]
-        exam_students[exam] = subset['Student ID'].unique().tolist()
-        exam_course[exam] = subset['Course Name'].iloc[0] if not subset.empty else "Unknown Course"
+    index = build_enrollment_index(data)
+    exam_students = index.exam_students
+    exam_course = index.exam_course
+    student_exams = index.student_exams
     
     # --- Initialize schedules ---
     exam_dates = {}  # exam -> date
-    student_schedule = {student: set() for student in data['Student ID'].unique()}  # student -> set of dates
+    student_schedule = {student: set() for student in index.students}  # student -> set of dates
 
     # --- 1) Handle fixed schedules first ---
     for exam, fixed_day in fixed_schedules.items():
@@ -60,7 +60,7 @@ def schedule_exams(data, start_date, end_date, excluded_dates, fixed_schedules):
                 student_schedule[student].add(fixed_day)
 
     # --- 2) Schedule remaining exams ---
-    remaining_exams = [e for e in data['Exam ID'].unique() if e not in exam_dates]
+    remaining_exams = [e for e in index.exams if e not in exam_dates]
     # Sort by number of students (descending), so higher-risk (larger) exams get scheduled first
     remaining_exams.sort(key=lambda e: len(exam_students[e]), reverse=True)
 
@@ -87,7 +87,7 @@ def schedule_exams(data, start_date, end_date, excluded_dates, fixed_schedules):
     # --- 4) Check overall conflicts ---
     conflicts_found = False
     for student, days in student_schedule.items():
-        registered_exams = data[data['Student ID'] == student]['Exam ID'].nunique()
+        registered_exams = len(student_exams[student])
         # If the student has fewer scheduled days than exams, they must share at least one day.
         if len(days) < registered_exams:
             print(f"Conflict: Student {student} has {registered_exams} exams but only {len(days)} days scheduled.")
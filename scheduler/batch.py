@@ -0,0 +1,287 @@
+# scheduler/batch.py
+"""
+Schedules many faculties or terms in one run, without the web app.
+
+The manifest is a JSON file with a list of runs, or {"defaults": {...},
+"runs": [...]} where every run is merged over the defaults:
+
+  {
+    "defaults": {"first_date": "2025-05-12", "last_date": "2025-06-06",
+                 "excluded_dates": ["2025-05-29"], "strategy": "dsatur"},
+    "runs": [
+      {"name": "engineering", "file": "engineering.xlsx",
+       "fixed_schedules": {"EX8": "2025-05-12"}},
+      {"name": "law", "file": "law.csv", "slots_per_day": 2,
+       "rooms": {"Hall A": 200, "Room 2": 40}, "spread_load": true}
+    ]
+  }
+
+Run keys (see RUN_DEFAULTS): file (relative to the manifest), name (default:
+the file name without extension), first_date, last_date, excluded_dates,
+fixed_schedules, strategy, slots_per_day, rooms, improve_seconds, solver
+("greedy", "portfolio" or "exact"), exact_time_limit, portfolio_runs (runs of
+the portfolio solver, spread over one process per CPU; default one per CPU),
+spread_load (steer placement with the default soft constraints) and
+soft_constraints (explicit settings).
+
+Every run writes to <output-dir>/<name>/: schedule.csv (extended solution),
+forced_schedule.csv and conflicts.csv (conflict-minimized solution),
+student_load.csv, summary.json and, with --calendars, one image per month of
+the extended schedule in calendars/. <output-dir>/summary.csv has one line per
+run. Runs are spread over --workers processes; matplotlib is only imported
+when PNG calendars are requested, Flask never.
+
+Usage:
+  python -m scheduler.batch manifest.json --output-dir out [--workers 4] [--calendars png|svg]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from .enrollment import build_enrollment_index
+from .metrics import recording
+from .portfolio import schedule_exams_portfolio
+from .scheduler import (
+    STRATEGIES,
+    compute_student_load_details,
+    compute_student_load_summary,
+    iter_conflict_details,
+    read_and_analyze_data,
+    schedule_exams_with_options,
+)
+from .student_load import SOFT_CONSTRAINTS
+
+# Parameters of a run that are not required, with their defaults.
+RUN_DEFAULTS = {
+    "name": None,
+    "excluded_dates": [],
+    "fixed_schedules": {},
+    "strategy": "largest_first",
+    "slots_per_day": 1,
+    "rooms": {},
+    "improve_seconds": 0.0,
+    "solver": "greedy",
+    "exact_time_limit": 10.0,
+    "portfolio_runs": None,
+    "spread_load": False,
+    "soft_constraints": None,
+}
+REQUIRED_KEYS = ("file", "first_date", "last_date")
+
+SCHEDULE_HEADER = ["Scheduled Date", "Exam ID", "Course", "# of Students", "Session", "Rooms"]
+CONFLICTS_HEADER = ["Student ID", "Date", "Exams"]
+LOAD_HEADER = ["Student ID", "Back-to-Back Days", "Exams Over Limit", "Penalty"]
+SUMMARY_FIELDS = ["name", "status", "normal_complete", "extended_last_date", "total_conflicts",
+                  "impacted_students", "back_to_back", "window_excess", "seconds", "error"]
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def load_manifest(path):
+    """
+    Reads a manifest and returns its runs with defaults applied, dates parsed
+    and files resolved relative to the manifest. Raises ValueError for
+    unknown keys, missing keys, bad values or duplicate names.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"runs": manifest}
+    defaults = manifest.get("defaults", {})
+    base = os.path.dirname(os.path.abspath(path))
+    runs = []
+    names = set()
+    for i, entry in enumerate(manifest.get("runs", [])):
+        run = {**RUN_DEFAULTS, **defaults, **entry}
+        unknown = set(run) - set(RUN_DEFAULTS) - set(REQUIRED_KEYS)
+        if unknown:
+            raise ValueError(f"Run {i}: unknown keys {', '.join(sorted(unknown))}")
+        missing = [key for key in REQUIRED_KEYS if key not in run]
+        if missing:
+            raise ValueError(f"Run {i}: missing {', '.join(missing)}")
+        try:
+            run["first_date"] = _parse_date(run["first_date"])
+            run["last_date"] = _parse_date(run["last_date"])
+            run["excluded_dates"] = [_parse_date(d) for d in run["excluded_dates"]]
+            run["fixed_schedules"] = {exam: _parse_date(d)
+                                      for exam, d in run["fixed_schedules"].items()}
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Run {i}: dates must be YYYY-MM-DD ({e})")
+        if run["strategy"] not in STRATEGIES:
+            raise ValueError(f"Run {i}: unknown strategy {run['strategy']}")
+        if run["solver"] not in ("greedy", "portfolio", "exact"):
+            raise ValueError(f"Run {i}: unknown solver {run['solver']}")
+        if run["solver"] == "exact" and (run["slots_per_day"] > 1 or run["rooms"]):
+            raise ValueError(f"Run {i}: the exact solver schedules whole days without rooms")
+        if run["solver"] == "exact" and (run["spread_load"] or run["soft_constraints"] is not None):
+            raise ValueError(f"Run {i}: the exact solver does not spread student load")
+        if run["spread_load"] and run["soft_constraints"] is None:
+            run["soft_constraints"] = dict(SOFT_CONSTRAINTS)
+        run["file"] = os.path.join(base, run["file"])
+        run["name"] = run["name"] or os.path.splitext(os.path.basename(run["file"]))[0]
+        if run["name"] in names:
+            raise ValueError(f"Run {i}: duplicate name {run['name']}")
+        names.add(run["name"])
+        runs.append(run)
+    return runs
+
+
+def _write_csv(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def _write_calendars(directory, schedule, calendars):
+    """Writes one calendar image per month of `schedule` ("png" or "svg")."""
+    from .calendar_utils import render_calendar_png, render_calendar_svg
+    os.makedirs(directory, exist_ok=True)
+    for year, month in schedule.months():
+        path = os.path.join(directory, f"{year}-{month:02d}.{calendars}")
+        if calendars == "png":
+            with open(path, "wb") as f:
+                f.write(render_calendar_png(schedule, year, month))
+        else:
+            with open(path, "w") as f:
+                f.write(render_calendar_svg(schedule, year, month))
+
+
+def run_one(run, output_dir, calendars=None):
+    """
+    Schedules one manifest run and writes its files to output_dir/<name>/.
+    Returns its summary (also written as summary.json); a failing run is
+    reported with status "failed" and the error instead of raising.
+    """
+    start = time.perf_counter()
+    directory = os.path.join(output_dir, run["name"])
+    summary = {"name": run["name"], "file": run["file"]}
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with recording() as recorder:
+            index = build_enrollment_index(read_and_analyze_data(run["file"]))
+            if run["solver"] == "exact":
+                from .exact import schedule_exams_exact
+                solutions = schedule_exams_exact(
+                    index, run["first_date"], run["last_date"], run["excluded_dates"],
+                    run["fixed_schedules"], time_limit=run["exact_time_limit"],
+                    strategy=run["strategy"], improve_seconds=run["improve_seconds"])
+            elif run["solver"] == "portfolio":
+                solutions = schedule_exams_portfolio(
+                    index, run["first_date"], run["last_date"], run["excluded_dates"],
+                    run["fixed_schedules"], num_runs=run["portfolio_runs"],
+                    improve_seconds=run["improve_seconds"], slots_per_day=run["slots_per_day"],
+                    rooms=run["rooms"], soft_constraints=run["soft_constraints"])
+            else:
+                solutions = schedule_exams_with_options(
+                    index, run["first_date"], run["last_date"], run["excluded_dates"],
+                    run["fixed_schedules"], strategy=run["strategy"],
+                    improve_seconds=run["improve_seconds"], slots_per_day=run["slots_per_day"],
+                    rooms=run["rooms"], soft_constraints=run["soft_constraints"])
+            extended, forced = solutions["extended_solution"], solutions["conflict_solution"]
+            for solution in (extended, forced):
+                if solution["student_load"] is None:
+                    solution["student_load"] = compute_student_load_summary(
+                        index, solution["schedule"], run["soft_constraints"])
+            _write_csv(os.path.join(directory, "schedule.csv"), SCHEDULE_HEADER,
+                       extended["schedule"].string_rows(index))
+            _write_csv(os.path.join(directory, "forced_schedule.csv"), SCHEDULE_HEADER,
+                       forced["schedule"].string_rows(index))
+            _write_csv(os.path.join(directory, "conflicts.csv"), CONFLICTS_HEADER,
+                       iter_conflict_details(index, forced["schedule"]))
+            _write_csv(os.path.join(directory, "student_load.csv"), LOAD_HEADER,
+                       compute_student_load_details(index, extended["schedule"],
+                                                    run["soft_constraints"]))
+            if calendars:
+                _write_calendars(os.path.join(directory, "calendars"), extended["schedule"],
+                                 calendars)
+        summary.update(
+            status="ok",
+            normal_complete=solutions["normal_complete"],
+            extended_last_date=extended["extended_last_date"].strftime("%Y-%m-%d"),
+            total_conflicts=forced["total_conflicts"],
+            impacted_students=forced["impacted_students"],
+            extended_student_load=extended["student_load"],
+            conflict_student_load=forced["student_load"],
+            exact=solutions.get("exact"),
+            **recorder.as_dict(),
+        )
+    except Exception as e:
+        summary.update(status="failed", error=f"{type(e).__name__}: {e}")
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    if os.path.isdir(directory):
+        with open(os.path.join(directory, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+def run_batch(runs, output_dir, workers=1, calendars=None, progress=None):
+    """
+    Runs every manifest run (see run_one), across `workers` processes when
+    there is more than one, and writes output_dir/summary.csv. Returns the
+    summaries in manifest order; `progress` is called with each summary as
+    its run finishes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    summaries = {}
+    if workers <= 1 or len(runs) <= 1:
+        for run in runs:
+            summaries[run["name"]] = run_one(run, output_dir, calendars)
+            if progress:
+                progress(summaries[run["name"]])
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(runs))) as pool:
+            futures = [pool.submit(run_one, run, output_dir, calendars) for run in runs]
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries[summary["name"]] = summary
+                if progress:
+                    progress(summary)
+    ordered = [summaries[run["name"]] for run in runs]
+    with open(os.path.join(output_dir, "summary.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for summary in ordered:
+            load = summary.get("extended_student_load") or {}
+            writer.writerow({**summary, "back_to_back": load.get("back_to_back"),
+                             "window_excess": load.get("window_excess")})
+    return ordered
+
+
+def _print_progress(summary):
+    if summary["status"] == "ok":
+        print(f"{summary['name']}: ok in {summary['seconds']}s, "
+              f"extended to {summary['extended_last_date']}, "
+              f"{summary['total_conflicts']} conflicts when forced", file=sys.stderr)
+    else:
+        print(f"{summary['name']}: FAILED ({summary['error']})", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("manifest", help="JSON manifest of runs")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="parallel processes (default: one per CPU)")
+    parser.add_argument("--calendars", choices=("png", "svg"),
+                        help="also write monthly calendar images")
+    args = parser.parse_args(argv)
+    try:
+        runs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    summaries = run_batch(runs, args.output_dir, args.workers, args.calendars,
+                          progress=_print_progress)
+    return 1 if any(summary["status"] != "ok" for summary in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
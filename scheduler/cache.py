@@ -0,0 +1,130 @@
+# scheduler/cache.py
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def file_digest(file, chunk_size=1 << 20):
+    """
+    Returns the SHA-256 hex digest of a path or an uploaded file's bytes. For
+    file objects the read position is restored afterwards, so the file can
+    still be parsed.
+    """
+    sha = hashlib.sha256()
+    if hasattr(file, "read"):
+        stream = getattr(file, "stream", file)
+        position = stream.tell()
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            sha.update(chunk)
+        stream.seek(position)
+    else:
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+def solution_key(digest, first_date, last_date, excluded_dates, fixed_schedules, **options):
+    """
+    Returns the cache key of a scheduling run: the uploaded file's digest plus
+    every parameter that can change the result.
+    """
+    parts = [
+        digest,
+        first_date.isoformat(),
+        last_date.isoformat(),
+        ",".join(sorted(d.isoformat() for d in excluded_dates)),
+        ",".join(f"{exam}={d.isoformat()}" for exam, d in sorted(fixed_schedules.items())),
+    ]
+    parts += [f"{name}={options[name]!r}" for name in sorted(options)]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache keyed by filename-safe strings, with an optional
+    on-disk layer that survives restarts.
+
+    Up to `max_entries` values are kept in memory. If `directory` is given,
+    every value is also pickled to `<directory>/<key>.pkl`; a miss in memory
+    falls back to disk, and the disk layer keeps at most `max_disk_entries`
+    files, evicting the least recently used (by modification time, which is
+    refreshed on every hit).
+    """
+
+    def __init__(self, max_entries=16, directory=None, max_disk_entries=256):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                if self.directory and os.path.exists(self._path(key)):
+                    os.utime(self._path(key))
+                return self._entries[key]
+        if not self.directory:
+            return default
+        try:
+            with open(self._path(key), "rb") as f:
+                value = pickle.load(f)
+            os.utime(self._path(key))
+        except OSError:
+            return default
+        except Exception:
+            # Truncated, or pickled by an older version of the cached classes
+            # (AttributeError, ImportError, ...): drop it and treat as a miss.
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return default
+        with self._lock:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if not self.directory:
+            return
+        # Write to a temporary file first so readers never see a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_disk_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
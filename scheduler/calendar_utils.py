@@ -2,18 +2,40 @@
 import calendar
 import io
 import base64
-import matplotlib.pyplot as plt
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
 
-def plot_calendar_month(exam_dates, year, month):
+from .metrics import count, stage
+from .schedule import Schedule
+
+# matplotlib is imported by the functions that draw PNGs, so the SVG renderer
+# and calendar_months() work without loading it. Figures reused by
+# render_calendar_png, one per number of week rows; the grid, title and
+# styling are drawn once and only cell text and colours change.
+_templates = {}
+_template_lock = threading.Lock()
+
+# Fewest months render_calendar_pngs hands to each pool worker; starting a
+# worker and building its templates costs about as much as a few months.
+MONTHS_PER_WORKER = 4
+
+def _month_cells(exam_dates, year, month):
     """
-    Creates a matplotlib figure for the calendar of a given month with exam IDs annotated.
-    Cells with one exam are shaded light green; cells with multiple exams are shaded light pink.
+    Returns (table_data, table_colors) for a month: one row per week, one cell
+    per weekday with the day number and its exam IDs. Cells with one exam are
+    shaded light green; cells with multiple exams are shaded light pink.
+    `exam_dates` is an {exam: date} dictionary or a Schedule.
     """
     # Map day -> list of exam IDs
-    day_exams = {}
-    for exam, dt in exam_dates.items():
-        if dt.year == year and dt.month == month:
-            day_exams.setdefault(dt.day, []).append(exam)
+    if isinstance(exam_dates, Schedule):
+        day_exams = exam_dates.month(year, month)
+    else:
+        day_exams = {}
+        for exam, dt in exam_dates.items():
+            if dt.year == year and dt.month == month:
+                day_exams.setdefault(dt.day, []).append(exam)
     
     cal_matrix = calendar.monthcalendar(year, month)
     table_data = []
@@ -42,6 +64,15 @@ def plot_calendar_month(exam_dates, year, month):
                 row_data.append(cell_text)
         table_data.append(row_data)
         table_colors.append(row_colors)
+    return table_data, table_colors
+
+def plot_calendar_month(exam_dates, year, month):
+    """
+    Creates a matplotlib figure for the calendar of a given month with exam IDs annotated.
+    Cells with one exam are shaded light green; cells with multiple exams are shaded light pink.
+    """
+    import matplotlib.pyplot as plt
+    table_data, table_colors = _month_cells(exam_dates, year, month)
     
     fig, ax = plt.subplots(figsize=(10, 6))
     ax.axis("off")
@@ -59,30 +90,175 @@ def plot_calendar_month(exam_dates, year, month):
     plt.tight_layout()
     return fig
 
-def generate_calendar_images(exam_dates):
+def _calendar_template(num_weeks):
     """
-    Automatically generates base64-encoded PNG images for all months in the range of scheduled exam dates.
-    Returns a dictionary with keys as (year, month) tuples and values as base64 strings.
+    Returns (fig, table, title, layouts) for a month with `num_weeks` week
+    rows, built like plot_calendar_month and cached in _templates. `layouts`
+    maps a title height to the subplot parameters tight_layout chose for it
+    and the bounding box savefig(bbox_inches="tight") computes for them.
     """
+    template = _templates.get(num_weeks)
+    if template is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        # Created outside pyplot so plt.close("all") elsewhere cannot close a
+        # template that is still in use (and pyplot need not be imported).
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.axis("off")
+        the_table = ax.table(
+            cellText=[[""] * 7 for _ in range(num_weeks)],
+            cellColours=[["white"] * 7 for _ in range(num_weeks)],
+            loc="center",
+            cellLoc="center",
+            edges="vertical"
+        )
+        the_table.auto_set_font_size(False)
+        the_table.set_fontsize(10)
+        the_table.scale(1, 2)
+        title = ax.set_title("", fontsize=16)
+        template = _templates[num_weeks] = (fig, the_table, title, {})
+    return template
+
+def _apply_layout(fig, title, layouts, dpi):
+    """
+    Positions the axes as plt.tight_layout() would for the current title and
+    returns the bbox_inches that savefig(bbox_inches="tight") would use at
+    `dpi`. Both only depend on the title's height (the cells are fixed size
+    and their text is not part of the tight bbox), so they are computed once
+    per distinct height, starting from the default subplot parameters like a
+    fresh figure, and replayed afterwards.
+    """
+    from matplotlib import rcParams
+    height = title.get_window_extent(fig.canvas.get_renderer()).height
+    layout = layouts.get(height)
+    if layout is None:
+        fig.subplots_adjust(**{name: rcParams[f"figure.subplot.{name}"]
+                               for name in ("left", "right", "bottom", "top", "wspace", "hspace")})
+        fig.tight_layout()
+        sp = fig.subplotpars
+        params = dict(left=sp.left, right=sp.right, bottom=sp.bottom, top=sp.top)
+        # Same steps as savefig: measure at the output dpi, then pad.
+        screen_dpi = fig.dpi
+        fig.dpi = dpi
+        try:
+            fig.draw_without_rendering()
+            bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(rcParams["savefig.pad_inches"])
+        finally:
+            fig.dpi = screen_dpi
+        layout = layouts[height] = (params, bbox)
+    else:
+        fig.subplots_adjust(**layout[0])
+    return layout[1]
+
+def calendar_months(exam_dates):
+    """Returns the (year, month) pairs from the first to the last scheduled exam date."""
+    if isinstance(exam_dates, Schedule):
+        return exam_dates.months()
     if not exam_dates:
-        return {}
+        return []
     
     min_date = min(exam_dates.values())
     max_date = max(exam_dates.values())
-    images = {}
+    months = []
     
     current_year, current_month = min_date.year, min_date.month
     while (current_year < max_date.year) or (current_year == max_date.year and current_month <= max_date.month):
-        fig = plot_calendar_month(exam_dates, current_year, current_month)
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-        buf.seek(0)
-        img_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        images[(current_year, current_month)] = img_b64
-        plt.close(fig)
+        months.append((current_year, current_month))
         if current_month == 12:
             current_month = 1
             current_year += 1
         else:
             current_month += 1
-    return images
+    return months
+
+def render_calendar_png(exam_dates, year, month):
+    """
+    Returns the PNG bytes of plot_calendar_month at dpi=150. The figure comes
+    from a per-layout template (see _calendar_template) and only the cells and
+    title are updated, which gives the same bytes as drawing it from scratch.
+    """
+    table_data, table_colors = _month_cells(exam_dates, year, month)
+    with _template_lock, stage("render"):
+        fig, the_table, title, layouts = _calendar_template(len(table_data))
+        cells = the_table.get_celld()
+        for row, (row_data, row_colors) in enumerate(zip(table_data, table_colors)):
+            for col, (cell_text, color) in enumerate(zip(row_data, row_colors)):
+                cells[row, col].get_text().set_text(cell_text)
+                cells[row, col].set_facecolor(color)
+        title.set_text(f"{calendar.month_name[month]} {year}")
+        bbox = _apply_layout(fig, title, layouts, dpi=150)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=150, bbox_inches=bbox)
+    count("calendar_months")
+    return buf.getvalue()
+
+def _render_month_png(args):
+    exam_dates, year, month = args
+    return render_calendar_png(exam_dates, year, month)
+
+def render_calendar_pngs(exam_dates, workers=1):
+    """
+    Renders every month of calendar_months(exam_dates) with
+    render_calendar_png and returns {(year, month): png_bytes}. Months are
+    rendered one after another by default; with workers > 1 (None for one per
+    CPU) they are spread over a process pool, each worker keeping its own
+    templates. A pool only pays off for long schedules, so every worker gets
+    at least MONTHS_PER_WORKER months and shorter ones stay serial.
+    """
+    months = calendar_months(exam_dates)
+    workers = min(workers or os.cpu_count() or 1, len(months) // MONTHS_PER_WORKER)
+    if workers <= 1:
+        pngs = [render_calendar_png(exam_dates, year, month) for year, month in months]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pngs = list(pool.map(_render_month_png, [(exam_dates, year, month) for year, month in months]))
+    return dict(zip(months, pngs))
+
+def render_calendar_svg(exam_dates, year, month):
+    """
+    Returns the calendar of a month as a standalone SVG string, with the same
+    cells and colours as plot_calendar_month but drawn without matplotlib.
+    """
+    with stage("render"):
+        return _calendar_svg(exam_dates, year, month)
+
+def _calendar_svg(exam_dates, year, month):
+    count("calendar_months")
+    table_data, table_colors = _month_cells(exam_dates, year, month)
+    cell_width, line_height, padding, title_height = 130, 15, 8, 40
+    
+    row_heights = [max(2, max(cell.count("\n") + 1 for cell in row)) * line_height + 2 * padding
+                   for row in table_data]
+    width = 7 * cell_width
+    height = title_height + sum(row_heights)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width + 2}" height="{height + 2}" '
+        f'viewBox="-1 -1 {width + 2} {height + 2}" font-family="sans-serif" font-size="11">',
+        f'<text x="{width / 2}" y="{title_height - 14}" text-anchor="middle" font-size="18">'
+        f'{calendar.month_name[month]} {year}</text>',
+    ]
+    y = title_height
+    for row, colors, row_height in zip(table_data, table_colors, row_heights):
+        for col, (cell, color) in enumerate(zip(row, colors)):
+            x = col * cell_width
+            parts.append(f'<rect x="{x}" y="{y}" width="{cell_width}" height="{row_height}" '
+                         f'fill="{color}" stroke="#000" stroke-width="0.5"/>')
+            lines = cell.split("\n") if cell else []
+            top = y + (row_height - len(lines) * line_height) / 2 + line_height - 3
+            for i, line in enumerate(lines):
+                parts.append(f'<text x="{x + cell_width / 2}" y="{top + i * line_height}" '
+                             f'text-anchor="middle">{escape(line)}</text>')
+        y += row_height
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+def generate_calendar_images(exam_dates, workers=1):
+    """
+    Automatically generates base64-encoded PNG images for all months in the range of scheduled exam dates.
+    Returns a dictionary with keys as (year, month) tuples and values as base64 strings.
+    `workers` is passed to render_calendar_pngs.
+    """
+    return {key: base64.b64encode(png).decode("utf-8")
+            for key, png in render_calendar_pngs(exam_dates, workers).items()}
@@ -0,0 +1,116 @@
+# scheduler/capacity.py
+
+import heapq
+
+import numpy as np
+
+
+def slot_label(slot, slots_per_day):
+    """
+    Name of session `slot` (0-based) of a day: "" when there is one session a
+    day, "AM" / "PM" with two, "S1", "S2", ... otherwise.
+    """
+    if slots_per_day == 1:
+        return ""
+    if slots_per_day == 2:
+        return ("AM", "PM")[slot]
+    return f"S{slot + 1}"
+
+
+class SlotCapacity:
+    """
+    Free seats of every slot (a slot is day offset * slots_per_day + session)
+    when each slot has the same `rooms` ({room: seats}) available.
+
+    The free seats per slot are the leaves of a max segment tree, so
+    first_fit(size, start) finds the earliest slot >= start that can still
+    seat an exam in O(log slots) instead of rescanning every slot, and take()
+    updates it in O(log slots). An exam may be split over several rooms and a
+    room may be shared by several exams; each slot keeps a max-heap of
+    (free seats, room) so the largest free rooms are filled first. The
+    number of slots grows on demand (the extended solution can place exams
+    after last_date); slots never used have all their seats free.
+    """
+
+    def __init__(self, rooms, num_slots=64):
+        self.rooms = dict(rooms)
+        self.seats = sum(self.rooms.values())
+        # Rooms taken by each placed exam code, filled in by take().
+        self.assigned = {}
+        self._heaps = {}
+        self._size = 1
+        self._tree = np.full(2, self.seats, dtype=np.int64)
+        self._grow(num_slots)
+
+    def _grow(self, num_slots):
+        if num_slots <= self._size:
+            return
+        size = self._size
+        while size < num_slots:
+            size *= 2
+        leaves = np.full(size, self.seats, dtype=np.int64)
+        leaves[:self._size] = self._tree[self._size:]
+        tree = np.empty(2 * size, dtype=np.int64)
+        tree[size:] = leaves
+        # Every level is the pairwise max of the level below.
+        level = size
+        while level > 1:
+            tree[level // 2:level] = np.maximum(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+            level //= 2
+        self._size, self._tree = size, tree
+
+    def remaining(self, slot):
+        """Free seats of `slot`."""
+        return int(self._tree[self._size + slot]) if slot < self._size else self.seats
+
+    def first_fit(self, size, start=0):
+        """
+        Returns the earliest slot >= start with at least `size` free seats.
+        Slots past the ones used so far are free, so for size <= seats there
+        always is one.
+        """
+        if start >= self._size:
+            return start
+        tree, leaves = self._tree, self._size
+        node = leaves + start
+        while tree[node] < size:
+            # Climb while node is a right child, then move to the next subtree.
+            while node & 1:
+                node >>= 1
+                if node == 0:
+                    return leaves
+            node += 1
+        while node < leaves:
+            node = 2 * node if tree[2 * node] >= size else 2 * node + 1
+        return node - leaves
+
+    def take(self, slot, size, exam_code=None):
+        """
+        Seats `size` students in `slot`, largest free rooms first, and returns
+        the rooms used (also recorded in `assigned` under `exam_code`).
+        """
+        self._grow(slot + 1)
+        heap = self._heaps.get(slot)
+        if heap is None:
+            heap = [(-seats, room) for room, seats in self.rooms.items()]
+            heapq.heapify(heap)
+            self._heaps[slot] = heap
+        used_rooms = []
+        needed = size
+        while needed > 0 and heap:
+            free, room = heapq.heappop(heap)
+            used = min(-free, needed)
+            needed -= used
+            used_rooms.append(room)
+            if -free > used:
+                heapq.heappush(heap, (free + used, room))
+        node = self._size + slot
+        self._tree[node] -= size - needed
+        node >>= 1
+        while node:
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+            node >>= 1
+        rooms = tuple(used_rooms)
+        if exam_code is not None:
+            self.assigned[exam_code] = rooms
+        return rooms
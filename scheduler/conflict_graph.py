@@ -0,0 +1,160 @@
+# scheduler/conflict_graph.py
+
+import numpy as np
+
+from .csr import patch_rows
+
+
+class ConflictGraph:
+    """
+    Sparse exam x exam conflict graph in CSR form.
+
+    Two exams are adjacent when at least one student is registered for both;
+    the edge weight is the number of shared students. The neighbours of exam
+    code ``i`` are ``indices[indptr[i]:indptr[i + 1]]`` (sorted) with matching
+    ``weights``. Exam codes are those of the EnrollmentIndex the graph was
+    built from.
+    """
+
+    def __init__(self, index, indptr, indices, weights):
+        self.index = index
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+
+    @property
+    def num_exams(self):
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self):
+        """Number of undirected edges."""
+        return len(self.indices) // 2
+
+    @property
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def neighbours(self, exam_code):
+        """Exam codes sharing at least one student with the given exam code."""
+        return self.indices[self.indptr[exam_code]:self.indptr[exam_code + 1]]
+
+    def neighbour_weights(self, exam_code):
+        """Shared-student counts, aligned with neighbours(exam_code)."""
+        return self.weights[self.indptr[exam_code]:self.indptr[exam_code + 1]]
+
+    def conflict_count(self, exam_a, exam_b):
+        """Number of students registered for both exam codes."""
+        lo, hi = self.indptr[exam_a], self.indptr[exam_a + 1]
+        pos = lo + np.searchsorted(self.indices[lo:hi], exam_b)
+        if pos < hi and self.indices[pos] == exam_b:
+            return int(self.weights[pos])
+        return 0
+
+    def shared_students(self, exam_a, exam_b):
+        """Number of students registered for both Exam IDs (0 for unknown exams)."""
+        exam_code = self.index.exam_code
+        if exam_a not in exam_code or exam_b not in exam_code:
+            return 0
+        return self.conflict_count(exam_code[exam_a], exam_code[exam_b])
+
+    def blocked_days(self, exam_code, exam_offsets):
+        """
+        Bitmask of the day offsets already taken by the exam's neighbours, given
+        an array of day offsets per exam code (-1 for unplaced exams).
+        """
+        offsets = exam_offsets[self.neighbours(exam_code)]
+        mask = 0
+        for offset in np.unique(offsets[offsets >= 0]).tolist():
+            mask |= 1 << offset
+        return mask
+
+    def day_costs(self, exam_days, num_days):
+        """
+        Returns an exam x day matrix whose entry [e, d] is the number of students
+        of exam e who sit a neighbouring exam on day d, given an array of day
+        numbers per exam code (-1 for unplaced exams).
+        """
+        edge_rows = np.repeat(np.arange(self.num_exams), self.degrees)
+        edge_days = exam_days[self.indices]
+        placed = edge_days >= 0
+        costs = np.zeros((self.num_exams, num_days), dtype=np.int64)
+        np.add.at(costs, (edge_rows[placed], edge_days[placed]), self.weights[placed])
+        return costs
+
+
+def _pair_keys(loads, exam_codes, num_exams):
+    """
+    Given exam codes grouped by student (`loads` = group sizes), returns the key
+    a * num_exams + b of every ordered pair of distinct exams a, b in a group.
+    """
+    # Registration j of a student is paired with every registration of the same
+    # student: repeat j load times and walk the partner positions of its group.
+    group_starts = np.cumsum(loads) - loads
+    reg_loads = np.repeat(loads, loads)
+    reg_starts = np.repeat(group_starts, loads)
+    run_starts = np.cumsum(reg_loads) - reg_loads
+    within = np.arange(int(reg_loads.sum())) - np.repeat(run_starts, reg_loads)
+    exam_a = np.repeat(exam_codes, reg_loads)
+    exam_b = exam_codes[np.repeat(reg_starts, reg_loads) + within]
+    off_diagonal = exam_a != exam_b
+    return exam_a[off_diagonal].astype(np.int64) * num_exams + exam_b[off_diagonal]
+
+
+def _from_pair_keys(index, pair_key, weights):
+    num_exams = index.num_exams
+    rows = pair_key // max(num_exams, 1)
+    indices = pair_key - rows * num_exams
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=num_exams))))
+    return ConflictGraph(index, indptr, indices, weights)
+
+
+def _students_pair_keys(index, student_codes, num_exams):
+    exam_lists = [index.exams_of(s) for s in student_codes if s < index.num_students]
+    if not exam_lists:
+        return np.zeros(0, dtype=np.int64)
+    loads = np.array([len(exams) for exams in exam_lists])
+    return _pair_keys(loads, np.concatenate(exam_lists), num_exams)
+
+
+def build_conflict_graph(index):
+    """
+    Builds the ConflictGraph of an EnrollmentIndex by pairing up the exams of
+    every student in one vectorised pass.
+    """
+    student_ptr, student_exam_codes = index.student_csr
+    pair_key = _pair_keys(np.diff(student_ptr), student_exam_codes, index.num_exams)
+    pair_key, weights = np.unique(pair_key, return_counts=True)
+    return _from_pair_keys(index, pair_key, weights)
+
+
+def update_conflict_graph(graph, index, student_codes):
+    """
+    Returns the ConflictGraph of `index` by patching `graph`, which was built for
+    an earlier index with the same exam and student codes (new exams and
+    students may have been appended). Only the registrations of the given
+    student codes may differ between the two indexes, so only the rows of
+    their exams are rebuilt.
+    """
+    num_exams = index.num_exams
+    added = _students_pair_keys(index, student_codes, num_exams)
+    removed = _students_pair_keys(graph.index, student_codes, num_exams)
+    pair_key = np.concatenate((added, removed))
+    delta = np.concatenate((np.ones(len(added), dtype=np.int64), -np.ones(len(removed), dtype=np.int64)))
+    rows = pair_key // max(num_exams, 1)
+    cols = pair_key - rows * num_exams
+
+    new_rows = {}
+    for row in np.unique(rows).tolist():
+        in_row = rows == row
+        if row < graph.num_exams:
+            row_cols = np.concatenate((graph.neighbours(row), cols[in_row]))
+            row_delta = np.concatenate((graph.neighbour_weights(row), delta[in_row]))
+        else:
+            row_cols, row_delta = cols[in_row], delta[in_row]
+        row_cols, inverse = np.unique(row_cols, return_inverse=True)
+        row_weights = np.bincount(inverse, weights=row_delta, minlength=len(row_cols)).astype(np.int64)
+        keep = row_weights > 0
+        new_rows[row] = (row_cols[keep], row_weights[keep])
+    indptr, (indices, weights) = patch_rows(graph.indptr, (graph.indices, graph.weights), new_rows, num_exams)
+    return ConflictGraph(index, indptr, indices, weights)
@@ -0,0 +1,34 @@
+# scheduler/csr.py
+
+import numpy as np
+
+
+def patch_rows(ptr, columns, new_rows, num_rows):
+    """
+    Returns (ptr, columns) for a CSR structure with some rows replaced.
+
+    `columns` is a tuple of parallel value arrays, `new_rows` maps a row number
+    to a tuple of replacement arrays (one per column) and `num_rows` is the new
+    number of rows, which may exceed the old one; rows past the old end that
+    are not in `new_rows` are empty. Untouched rows are copied in contiguous
+    spans, so the cost is one pass over the values plus the changed rows.
+    """
+    old_num_rows = len(ptr) - 1
+    lengths = np.zeros(num_rows, dtype=np.int64)
+    lengths[:old_num_rows] = np.diff(ptr)
+    for row, values in new_rows.items():
+        lengths[row] = len(values[0])
+    new_ptr = np.concatenate(([0], np.cumsum(lengths)))
+
+    out = [np.empty(new_ptr[-1], dtype=column.dtype) for column in columns]
+    start = 0
+    for row in sorted(new_rows) + [num_rows]:
+        stop = min(row, old_num_rows)
+        if start < stop:
+            for target, column in zip(out, columns):
+                target[new_ptr[start]:new_ptr[stop]] = column[ptr[start]:ptr[stop]]
+        if row < num_rows:
+            for target, values in zip(out, new_rows[row]):
+                target[new_ptr[row]:new_ptr[row + 1]] = values
+        start = row + 1
+    return new_ptr, tuple(out)
@@ -0,0 +1,217 @@
+# scheduler/enrollment.py
+
+from functools import cached_property
+
+import numpy as np
+
+from .conflict_graph import build_conflict_graph, update_conflict_graph
+from .csr import patch_rows
+
+
+class EnrollmentIndex:
+    """
+    Integer-coded view of the registration table, built in a single pass.
+
+    Exams and students are numbered in order of first appearance (the same order
+    as ``data['Exam ID'].unique()`` / ``data['Student ID'].unique()``). The
+    de-duplicated registrations are kept in CSR form: the students of exam code
+    ``i`` are ``exam_student_codes[exam_ptr[i]:exam_ptr[i + 1]]``, in row order.
+    The dictionary lookups used by the scheduling functions are derived from
+    these arrays on first access.
+    """
+
+    def __init__(self, exams, students, courses, exam_ptr, exam_student_codes):
+        self.exams = exams                            # exam code -> Exam ID
+        self.students = students                      # student code -> Student ID
+        self.courses = courses                        # exam code -> Course Name
+        self.exam_ptr = exam_ptr                      # CSR row pointers, len = num_exams + 1
+        self.exam_student_codes = exam_student_codes  # CSR column indices (student codes)
+
+    @property
+    def num_exams(self):
+        return len(self.exams)
+
+    @property
+    def num_students(self):
+        return len(self.students)
+
+    @cached_property
+    def exam_sizes(self):
+        """Number of distinct students per exam code."""
+        return np.diff(self.exam_ptr)
+
+    @cached_property
+    def exam_code(self):
+        """Exam ID -> exam code."""
+        return {exam: i for i, exam in enumerate(self.exams)}
+
+    @cached_property
+    def student_code(self):
+        """Student ID -> student code."""
+        return {student: i for i, student in enumerate(self.students)}
+
+    @cached_property
+    def student_csr(self):
+        """
+        Transposed registrations as (student_ptr, student_exam_codes): the exams
+        of student code ``s`` are ``student_exam_codes[student_ptr[s]:student_ptr[s + 1]]``.
+        """
+        pair_exams = np.repeat(np.arange(self.num_exams), self.exam_sizes)
+        order = np.argsort(self.exam_student_codes, kind="stable")
+        counts = np.bincount(self.exam_student_codes, minlength=self.num_students)
+        student_ptr = np.concatenate(([0], np.cumsum(counts)))
+        return student_ptr, pair_exams[order]
+
+    def students_of(self, exam_code):
+        """Student codes registered for the given exam code."""
+        return self.exam_student_codes[self.exam_ptr[exam_code]:self.exam_ptr[exam_code + 1]]
+
+    def exams_of(self, student_code):
+        """Exam codes the given student code is registered for."""
+        student_ptr, student_exam_codes = self.student_csr
+        return student_exam_codes[student_ptr[student_code]:student_ptr[student_code + 1]]
+
+    @cached_property
+    def conflict_graph(self):
+        """ConflictGraph of the exams, built on first access."""
+        return build_conflict_graph(self)
+
+    @cached_property
+    def exam_students(self):
+        """Exam ID -> list of Student IDs."""
+        students = self.students
+        return {exam: [students[s] for s in self.students_of(i).tolist()]
+                for i, exam in enumerate(self.exams)}
+
+    @cached_property
+    def student_exams(self):
+        """Student ID -> list of Exam IDs."""
+        exams = self.exams
+        return {student: [exams[e] for e in self.exams_of(i).tolist()]
+                for i, student in enumerate(self.students)}
+
+    @cached_property
+    def exam_course(self):
+        """Exam ID -> Course Name."""
+        return dict(zip(self.exams, self.courses))
+
+
+def build_enrollment_index(data):
+    """
+    Builds an EnrollmentIndex from a DataFrame with 'Student ID', 'Exam ID'
+    and 'Course Name' columns. Rows with a missing Student ID or Exam ID are
+    ignored.
+    """
+    # pandas is already loaded by whoever built `data`; importing it here keeps
+    # it off the import path of code that only uses prebuilt indexes.
+    import pandas as pd
+    exam_codes, exam_labels = pd.factorize(data['Exam ID'])
+    student_codes, student_labels = pd.factorize(data['Student ID'])
+    num_exams = len(exam_labels)
+    num_students = len(student_labels)
+
+    # Course name of each exam is taken from its first row.
+    has_exam = np.flatnonzero(exam_codes >= 0)
+    _, first_rows = np.unique(exam_codes[has_exam], return_index=True)
+    courses = data['Course Name'].to_numpy()[has_exam[first_rows]].tolist()
+
+    # De-duplicate (exam, student) pairs, keeping the first occurrence in row order.
+    valid = np.flatnonzero((exam_codes >= 0) & (student_codes >= 0))
+    pair_key = exam_codes[valid].astype(np.int64) * max(num_students, 1) + student_codes[valid]
+    _, first = np.unique(pair_key, return_index=True)
+    rows = valid[np.sort(first)]
+    pair_exams = exam_codes[rows]
+    pair_students = student_codes[rows]
+
+    order = np.argsort(pair_exams, kind="stable")
+    counts = np.bincount(pair_exams, minlength=num_exams)
+    exam_ptr = np.concatenate(([0], np.cumsum(counts)))
+
+    return EnrollmentIndex(
+        exams=exam_labels.tolist(),
+        students=student_labels.tolist(),
+        courses=courses,
+        exam_ptr=exam_ptr,
+        exam_student_codes=pair_students[order].astype(np.int64),
+    )
+
+
+def update_enrollment_index(index, added=(), removed=()):
+    """
+    Returns a new EnrollmentIndex with registrations added and removed, without
+    re-reading the registration table.
+
+      added:   iterable of (Student ID, Exam ID, Course Name)
+      removed: iterable of (Student ID, Exam ID)
+
+    Existing exams and students keep their codes; new ones are appended. Exams
+    and students left without registrations stay in the index. Only the CSR
+    rows of the touched exams (and students) are rebuilt, and if the conflict
+    graph of `index` has been built, the new index gets a patched copy of it.
+    """
+    exams = list(index.exams)
+    courses = list(index.courses)
+    students = list(index.students)
+    exam_code = dict(index.exam_code)
+    student_code = dict(index.student_code)
+
+    exam_rows = {}     # exam code -> list of student codes
+    student_rows = {}  # student code -> list of exam codes
+
+    def exam_row(code):
+        if code not in exam_rows:
+            exam_rows[code] = index.students_of(code).tolist() if code < index.num_exams else []
+        return exam_rows[code]
+
+    def student_row(code):
+        if code not in student_rows:
+            student_rows[code] = index.exams_of(code).tolist() if code < index.num_students else []
+        return student_rows[code]
+
+    for student, exam in removed:
+        if exam in exam_code and student in student_code:
+            e, s = exam_code[exam], student_code[student]
+            if s in exam_row(e):
+                exam_row(e).remove(s)
+                student_row(s).remove(e)
+    for student, exam, course in added:
+        if exam not in exam_code:
+            exam_code[exam] = len(exams)
+            exams.append(exam)
+            courses.append(course)
+        if student not in student_code:
+            student_code[student] = len(students)
+            students.append(student)
+        e, s = exam_code[exam], student_code[student]
+        if s not in exam_row(e):
+            exam_row(e).append(s)
+            student_row(s).append(e)
+
+    exam_ptr, (exam_student_codes,) = patch_rows(
+        index.exam_ptr, (index.exam_student_codes,),
+        {e: (np.array(row, dtype=np.int64),) for e, row in exam_rows.items()}, len(exams))
+    updated = EnrollmentIndex(
+        exams=exams,
+        students=students,
+        courses=courses,
+        exam_ptr=exam_ptr,
+        exam_student_codes=exam_student_codes,
+    )
+    old_ptr, old_exam_codes = index.student_csr
+    student_ptr, (student_exam_codes,) = patch_rows(
+        old_ptr, (old_exam_codes,),
+        {s: (np.array(sorted(row), dtype=np.int64),) for s, row in student_rows.items()}, len(students))
+    updated.student_csr = (student_ptr, student_exam_codes)
+    if "conflict_graph" in index.__dict__:
+        updated.conflict_graph = update_conflict_graph(index.conflict_graph, updated, sorted(student_rows))
+    return updated
+
+
+def as_enrollment_index(data):
+    """
+    Returns `data` unchanged if it is already an EnrollmentIndex, otherwise
+    builds one from the DataFrame.
+    """
+    if isinstance(data, EnrollmentIndex):
+        return data
+    return build_enrollment_index(data)
@@ -0,0 +1,287 @@
+# scheduler/exact.py
+
+import math
+from collections import Counter
+
+import numpy as np
+
+from .enrollment import as_enrollment_index
+from .metrics import StageClock, count
+from .schedule import Schedule
+from .scheduler import (
+    _count_conflicts,
+    _solution_fields,
+    find_weekdays,
+    schedule_exams_with_options,
+)
+
+# What the exact mode can optimise:
+#   span      - no conflicts, as few exam days as possible (extended_solution).
+#   conflicts - every exam within the requested range, as few conflicts as
+#               possible (conflict_solution).
+OBJECTIVES = ("span", "conflicts")
+
+DEFAULT_WORKERS = 8
+
+
+def _cp_model():
+    # OR-Tools is an optional dependency, only needed for the exact mode.
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError:
+        raise ImportError("The exact solving mode needs OR-Tools: pip install ortools") from None
+    return cp_model
+
+
+def _solve(cp_model, model, time_limit, workers):
+    """
+    Solves `model` for at most `time_limit` seconds. Returns (solver, info),
+    info being {"status", "objective", "best_bound", "gap", "seconds"}; the
+    objective, bound and gap are None if no solution was found in time.
+    """
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit)
+    # A single CP-SAT worker can lose the hint after presolve; the parallel
+    # portfolio (also worth it on fewer cores) always has a worker following it.
+    solver.parameters.num_workers = workers or DEFAULT_WORKERS
+    status = solver.Solve(model)
+    info = {"status": solver.StatusName(status), "objective": None, "best_bound": None,
+            "gap": None, "seconds": round(solver.WallTime(), 3)}
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        objective = int(round(solver.ObjectiveValue()))
+        # Objectives are integral, so a fractional bound can be rounded up.
+        bound = min(objective, math.ceil(solver.BestObjectiveBound() - 1e-6))
+        info.update(objective=objective, best_bound=bound, gap=_gap(objective, bound))
+    return solver, info
+
+
+def _gap(objective, bound):
+    return (objective - bound) / objective if objective else 0.0
+
+
+def _improves(info, greedy_objective):
+    """
+    Returns True if the solver found a better solution than the greedy one.
+    Otherwise the greedy solution is kept, and `info` is updated to describe it.
+    """
+    if info["objective"] is not None and info["objective"] < greedy_objective:
+        return True
+    info["objective"] = greedy_objective
+    if info["best_bound"] is not None:
+        info["gap"] = _gap(greedy_objective, info["best_bound"])
+    return False
+
+
+def _solve_span(cp_model, index, greedy, first_date, excluded_dates, time_limit, workers):
+    """
+    Conflict-free schedule on as few weekdays (counted from first_date, skipping
+    excluded dates) as possible. The horizon ends at the greedy extended_last_date
+    and the greedy extended schedule is the hint, so a solution always exists.
+    Exams the greedy kept on their fixed day stay there.
+    Returns ({exam: date} or None, info).
+    """
+    exam_code = index.exam_code
+    graph = index.conflict_graph
+    greedy_dates = greedy["exam_dates"]
+    days = find_weekdays(first_date, greedy["extended_last_date"], excluded_dates)
+    position = {d: k for k, d in enumerate(days)}
+
+    model = cp_model.CpModel()
+    day = [model.NewIntVar(0, len(days) - 1, f"d{c}") for c in range(index.num_exams)]
+    for exam, fixed_day in greedy["fixed"].items():
+        model.Add(day[exam_code[exam]] == position[fixed_day])
+    for code in range(index.num_exams):
+        for other in graph.neighbours(code):
+            if other > code:
+                model.Add(day[code] != day[other])
+    last = model.NewIntVar(0, len(days) - 1, "last")
+    model.AddMaxEquality(last, day)
+    # Exams of a clique need distinct days; stating it directly gives the
+    # solver its lower bound on the span.
+    clique = _greedy_clique(graph)
+    if len(clique) > 1:
+        model.AddAllDifferent([day[c] for c in clique])
+        model.Add(last >= len(clique) - 1)
+    # Objective: number of exam days used, i.e. position of the last one + 1.
+    model.Minimize(last + 1)
+    for exam, d in greedy_dates.items():
+        model.AddHint(day[exam_code[exam]], position[d])
+    count("exact_variables", len(day) + 1)
+
+    solver, info = _solve(cp_model, model, time_limit, workers)
+    if info["objective"] is None:
+        return None, info
+    return {exam: days[solver.Value(day[exam_code[exam]])] for exam in index.exams}, info
+
+
+def _greedy_clique(graph):
+    """
+    Returns a clique of the conflict graph (exam codes that pairwise share
+    students), grown greedily from the exam with the highest degree.
+    """
+    degrees = graph.degrees
+    if not len(degrees):
+        return []
+    clique = [int(np.argmax(degrees))]
+    candidates = set(graph.neighbours(clique[0]).tolist())
+    while candidates:
+        code = max(candidates, key=lambda c: (degrees[c], -c))
+        clique.append(code)
+        candidates &= set(graph.neighbours(code).tolist())
+    return clique
+
+
+def _exam_groups(index):
+    """
+    Students with two or more exams, grouped by their exact set of exam codes:
+    {(code, ...): number_of_students}. Students with the same exams always
+    have the same conflicts, so the model needs one set of variables per group.
+    """
+    student_ptr, student_exam_codes = index.student_csr
+    sizes = np.diff(student_ptr)
+    groups = Counter()
+    for student in np.flatnonzero(sizes > 1):
+        groups[tuple(sorted(student_exam_codes[student_ptr[student]:student_ptr[student + 1]].tolist()))] += 1
+    return groups
+
+
+def _solve_conflicts(cp_model, index, greedy_days, num_days, fixed_codes, time_limit, workers):
+    """
+    Every exam on one of `num_days` available days with as few conflicts as
+    possible (same definition as _count_conflicts). A student with n exams
+    spread over u distinct days has n - u conflicts, so the model maximises
+    the distinct days of every group of students with the same exams.
+    `greedy_days` (day index per exam code) is the hint; exams in `fixed_codes`
+    ({code: day}) stay on their day.
+    Returns (day index per exam code or None, info).
+    """
+    if not fixed_codes:
+        # Without fixed exams the days are interchangeable: number them in order
+        # of first use (by exam code) in the hint and require the same of the
+        # solution, so the solver does not explore relabelled copies.
+        first_use = {}
+        for k in greedy_days.tolist():
+            first_use.setdefault(k, len(first_use))
+        greedy_days = np.array([first_use[k] for k in greedy_days.tolist()])
+
+    model = cp_model.CpModel()
+    on_day = [[model.NewBoolVar(f"x{c}_{k}") for k in range(num_days)] for c in range(index.num_exams)]
+    for code, choices in enumerate(on_day):
+        model.AddExactlyOne(choices)
+        model.AddHint(choices[greedy_days[code]], 1)
+        for k, var in enumerate(choices):
+            if k != greedy_days[code]:
+                model.AddHint(var, 0)
+    for code, k in fixed_codes.items():
+        model.Add(on_day[code][k] == 1)
+    if not fixed_codes:
+        for code, choices in enumerate(on_day):
+            for var in choices[code + 1:]:
+                model.Add(var == 0)
+
+    groups = _exam_groups(index)
+    total, used, weights, hinted_used = 0, [], [], 0
+    for codes, students in groups.items():
+        total += students * len(codes)
+        hinted = set(greedy_days[list(codes)].tolist())
+        for k in range(num_days):
+            var = model.NewBoolVar("")
+            # A group can only count day k as used if one of its exams is on it.
+            model.AddBoolOr([on_day[c][k] for c in codes]).OnlyEnforceIf(var)
+            model.AddHint(var, k in hinted)
+            hinted_used += students * (k in hinted)
+            used.append(var)
+            weights.append(students)
+    conflicts = model.NewIntVar(0, total, "conflicts")
+    model.Add(conflicts == total - cp_model.LinearExpr.WeightedSum(used, weights))
+    model.Minimize(conflicts)
+    model.AddHint(conflicts, total - hinted_used)
+    count("exact_variables", index.num_exams * num_days + len(used))
+
+    solver, info = _solve(cp_model, model, time_limit, workers)
+    if info["objective"] is None:
+        return None, info
+    exam_days = np.array([next(k for k, var in enumerate(choices) if solver.Value(var)) for choices in on_day])
+    return exam_days, info
+
+
+def schedule_exams_exact(data, first_date, last_date, excluded_dates, fixed_schedules,
+                         objectives=OBJECTIVES, time_limit=10.0, workers=None,
+                         strategy="largest_first", improve_seconds=0.0):
+    """
+    Exact counterpart of schedule_exams_with_options for smaller faculties,
+    built on the OR-Tools CP-SAT solver (optional dependency).
+
+    The greedy schedule_exams_with_options result (with the given `strategy`
+    and `improve_seconds`) is computed first and used as the warm start. Then,
+    for each of `objectives`, a model of the exam -> day assignment is solved
+    for at most `time_limit` seconds:
+
+      span      - replaces extended_solution by a conflict-free schedule
+                  using as few weekdays (from first_date, without excluded
+                  dates) as possible.
+      conflicts - replaces conflict_solution by the schedule within the
+                  requested range with the fewest total conflicts.
+
+    Exams are placed on whole days (one session a day, no room limits).
+    Fixed exams stay on their day as in the greedy solution. If the time limit
+    runs out, the best schedule found so far is used; it is never worse than
+    the greedy one. Returns a dictionary shaped like the result of
+    schedule_exams_with_options plus
+       "exact": { objective: {"status", "objective", "best_bound", "gap", "seconds"}, ... }
+    where status is the CP-SAT status (OPTIMAL when proven optimal, FEASIBLE
+    when stopped by the time limit) and gap is (objective - best_bound) / objective.
+    """
+    for objective in objectives:
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown exact objective: {objective}")
+    cp_model = _cp_model()
+    clock = StageClock()
+
+    index = as_enrollment_index(data)
+    result = schedule_exams_with_options(index, first_date, last_date, excluded_dates, fixed_schedules,
+                                         strategy=strategy, improve_seconds=improve_seconds)
+    result["exact"] = {}
+    exam_code = index.exam_code
+    available_days = find_weekdays(first_date, last_date, excluded_dates)
+    clock.lap("exact_warm_start")
+
+    if "span" in objectives and index.num_exams:
+        greedy = result["extended_solution"]
+        fixed = {e: d for e, d in fixed_schedules.items()
+                 if d in available_days and greedy["exam_dates"].get(e) == d}
+        exam_dates, info = _solve_span(cp_model, index, dict(greedy, fixed=fixed), first_date,
+                                       excluded_dates, time_limit, workers)
+        greedy_days = len(find_weekdays(first_date, max(greedy["exam_dates"].values()), excluded_dates))
+        if _improves(info, greedy_days):
+            result["normal_complete"] = max(exam_dates.values()) <= last_date
+            result["extended_solution"] = {
+                **_solution_fields(index, Schedule.from_dates(index, exam_dates)),
+                "extended_last_date": max(last_date, max(exam_dates.values())),
+            }
+        result["exact"]["span"] = info
+        clock.lap("exact_span")
+
+    if "conflicts" in objectives and index.num_exams and available_days:
+        greedy = result["conflict_solution"]
+        greedy_days = np.full(index.num_exams, -1)
+        for exam, d in greedy["exam_dates"].items():
+            greedy_days[exam_code[exam]] = available_days.index(d)
+        fixed_codes = {exam_code[e]: available_days.index(d) for e, d in fixed_schedules.items()
+                       if e in exam_code and d in available_days}
+        exam_days, info = _solve_conflicts(cp_model, index, greedy_days, len(available_days), fixed_codes,
+                                           time_limit, workers)
+        if _improves(info, greedy["total_conflicts"]):
+            day_offsets = np.array([(d - first_date).days for d in available_days], dtype=np.int64)
+            total_conflicts, impacted_students = _count_conflicts(index, exam_days)
+            result["conflict_solution"] = {
+                **_solution_fields(index, Schedule.from_slots(index, first_date, day_offsets[exam_days])),
+                "total_conflicts": total_conflicts,
+                "impacted_students": impacted_students,
+            }
+        result["exact"]["conflicts"] = info
+        clock.lap("exact_conflicts")
+
+    for objective, info in result["exact"].items():
+        count(f"exact_{objective}_optimal", info["status"] == "OPTIMAL")
+    return result
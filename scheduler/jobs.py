@@ -0,0 +1,249 @@
+# scheduler/jobs.py
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from .metrics import Recorder, profiled, recording
+
+# Stages a scheduling job goes through, with the progress reported on entry.
+STAGES = {
+    "queued": 0.0,
+    "parse": 0.1,
+    "solve": 0.3,
+    "done": 1.0,
+}
+
+
+class JobStore:
+    """
+    SQLite-backed job table shared by the web process and the workers.
+
+    Each job has a status ("queued", "running", "done" or "failed"), the
+    current stage and progress, an error message for failed jobs, the
+    pickled result for finished ones and the job's recorded metrics (JSON).
+    Every call opens (and closes) its own connection, so a store can be used
+    from any thread or process.
+
+    With fail_unfinished, jobs still queued or running when the store is opened
+    are marked failed: their worker pool went away with the process that owned
+    it, so nothing will ever finish them. Only that process (the web app) should
+    pass it, not the workers.
+    """
+
+    def __init__(self, path, fail_unfinished=False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " stage TEXT NOT NULL,"
+                " progress REAL NOT NULL,"
+                " error TEXT,"
+                " result BLOB,"
+                " created REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            # Tables created before metrics were recorded lack the column.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "metrics" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN metrics TEXT")
+            if fail_unfinished:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated = ?"
+                    " WHERE status IN ('queued', 'running')",
+                    ("The server restarted before this job finished. Please run it again.", time.time()),
+                )
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed on exit."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self):
+        """Adds a queued job and returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, stage, progress, created, updated)"
+                " VALUES (?, 'queued', 'queued', 0.0, ?, ?)",
+                (job_id, now, now),
+            )
+        return job_id
+
+    def set_stage(self, job_id, stage):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', stage = ?, progress = ?, updated = ? WHERE id = ?",
+                (stage, STAGES[stage], time.time(), job_id),
+            )
+
+    def finish(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', stage = 'done', progress = 1.0, result = ?, updated = ?"
+                " WHERE id = ?",
+                (pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), time.time(), job_id),
+            )
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def set_metrics(self, job_id, metrics):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET metrics = ? WHERE id = ?", (json.dumps(metrics), job_id))
+
+    def recent_metrics(self, limit=50):
+        """
+        Returns the metrics of the `limit` most recently updated jobs that
+        recorded any, newest first, as dicts with "id", "status" and "updated"
+        added.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, status, updated, metrics FROM jobs WHERE metrics IS NOT NULL"
+                " ORDER BY updated DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(json.loads(metrics), id=job_id, status=status, updated=updated)
+                for job_id, status, updated, metrics in rows]
+
+    def status(self, job_id):
+        """
+        Returns {"id", "status", "stage", "progress", "error"} for a job, or
+        None if there is no such job.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, stage, progress, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, stage, progress, error = row
+        return {"id": job_id, "status": status, "stage": stage, "progress": progress, "error": error}
+
+    def result(self, job_id):
+        """Returns the result of a finished job, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return pickle.loads(row[0])
+
+    def purge(self, max_age):
+        """Deletes jobs that have not been updated for `max_age` seconds."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE updated < ?", (time.time() - max_age,))
+
+
+class JobQueue:
+    """
+    Runs functions on a local process pool and tracks them in a JobStore.
+
+    submit(fn, *args) creates a job and returns its id immediately; the worker
+    calls fn(store, job_id, *args), which reports its stages through the store
+    and returns the job's result. Exceptions mark the job as failed. The stage
+    timings and counters recorded while fn runs (see scheduler.metrics) are
+    saved with the job either way. With profile_dir, the job also runs under
+    cProfile and its stats are dumped to <profile_dir>/job-<id>.prof.
+
+    If a worker dies (killed by the OOM killer or a signal), the pool is
+    broken: its pending jobs are marked failed and the next submit starts a
+    new pool.
+    """
+
+    def __init__(self, store, max_workers=2):
+        self.store = store
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, profile_dir=None):
+        job_id = self.store.create()
+        with self._lock:
+            for attempt in range(2):
+                if self._pool is None:
+                    # Created on first use so that importing the web app does not fork.
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                pool = self._pool
+                try:
+                    future = pool.submit(_run_job, self.store.path, job_id, fn, args, profile_dir)
+                    break
+                except BrokenProcessPool:
+                    # Broken before its futures reported it: start over once.
+                    self._discard(pool)
+                    if attempt:
+                        self.store.fail(job_id, "The job could not be started.")
+                        raise
+        future.add_done_callback(lambda future: self._done(pool, job_id, future))
+        return job_id
+
+    def _done(self, pool, job_id, future):
+        """Fails a job whose worker did not report back (_run_job handles errors of fn itself)."""
+        if future.cancelled():
+            self.store.fail(job_id, "The job was cancelled.")
+            return
+        exc = future.exception()
+        if exc is None:
+            return
+        if isinstance(exc, BrokenProcessPool):
+            with self._lock:
+                self._discard(pool)
+            self.store.fail(job_id, "The worker running this job stopped unexpectedly (out of memory?).")
+        else:
+            self.store.fail(job_id, str(exc) or exc.__class__.__name__)
+
+    def _discard(self, pool):
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+def _run_job(store_path, job_id, fn, args, profile_dir=None):
+    store = JobStore(store_path)
+    recorder = Recorder()
+    start = time.perf_counter()
+    try:
+        with recording(recorder):
+            if profile_dir:
+                with profiled(os.path.join(profile_dir, f"job-{job_id}.prof")):
+                    result = fn(store, job_id, *args)
+            else:
+                result = fn(store, job_id, *args)
+    except Exception as exc:
+        traceback.print_exc()
+        store.set_metrics(job_id, dict(recorder.as_dict(), seconds=time.perf_counter() - start))
+        store.fail(job_id, str(exc) or exc.__class__.__name__)
+    else:
+        store.set_metrics(job_id, dict(recorder.as_dict(), seconds=time.perf_counter() - start))
+        store.finish(job_id, result)
@@ -0,0 +1,143 @@
+# scheduler/local_search.py
+
+import time
+
+import numpy as np
+
+
+class ConflictState:
+    """
+    Forced exam -> day assignment together with the counters needed to evaluate
+    and apply single-exam moves incrementally. Days are indices into the list
+    of available days; exams on day -1 are unscheduled.
+
+      cost[e, d]            students of exam e who sit a *different* exam on day d
+                            (summed over conflict-graph neighbours), so the pairwise
+                            change of moving e from d1 to d2 is cost[e, d2] - cost[e, d1].
+      load[s, d]            number of exams student s sits on day d.
+      student_conflicts[s]  sum over days of max(load[s, d] - 1, 0).
+
+    total_conflicts and impacted_students match the definitions used by
+    schedule_exams_with_options and are kept up to date by move().
+    """
+
+    def __init__(self, index, exam_days, num_days):
+        self.index = index
+        self.graph = index.conflict_graph
+        self.exam_days = exam_days.copy()
+        num_exams = index.num_exams
+
+        self.cost = self.graph.day_costs(self.exam_days, num_days)
+
+        reg_days = self.exam_days[np.repeat(np.arange(num_exams), index.exam_sizes)]
+        placed = reg_days >= 0
+        self.load = np.zeros((index.num_students, num_days), dtype=np.int8)
+        np.add.at(self.load, (index.exam_student_codes[placed], reg_days[placed]), 1)
+
+        self.student_conflicts = np.maximum(self.load.astype(np.int64) - 1, 0).sum(axis=1)
+        self.total_conflicts = int(self.student_conflicts.sum())
+        self.impacted_students = int(np.count_nonzero(self.student_conflicts))
+        codes = np.flatnonzero(self.exam_days >= 0)
+        self.pair_conflicts = int(self.cost[codes, self.exam_days[codes]].sum()) // 2
+
+    def move(self, exam_code, day):
+        """Moves a scheduled exam to another day, updating every counter."""
+        old = self.exam_days[exam_code]
+        neighbours = self.graph.neighbours(exam_code)
+        weights = self.graph.neighbour_weights(exam_code)
+        self.pair_conflicts += int(self.cost[exam_code, day] - self.cost[exam_code, old])
+        self.cost[neighbours, old] -= weights
+        self.cost[neighbours, day] += weights
+
+        students = self.index.students_of(exam_code)
+        before = self.student_conflicts[students]
+        leaving = self.load[students, old] >= 2
+        joining = self.load[students, day] >= 1
+        self.load[students, old] -= 1
+        self.load[students, day] += 1
+        after = before - leaving + joining
+        self.student_conflicts[students] = after
+        self.total_conflicts += int(np.count_nonzero(joining)) - int(np.count_nonzero(leaving))
+        self.impacted_students += int(np.count_nonzero(after)) - int(np.count_nonzero(before))
+        self.exam_days[exam_code] = day
+
+
+def tabu_search(index, exam_days, num_days, fixed_codes=(), time_budget=1.0,
+                max_iterations=None, should_stop=None, seed=0, tenure=10, sample_size=200,
+                slot_seats=None):
+    """
+    Improves a forced assignment (exam code -> day index, -1 = unscheduled) by
+    tabu search over single exam -> day moves.
+
+    Each iteration looks at up to `sample_size` exams that currently clash,
+    reads the pairwise change of every possible move from the cost matrix and
+    applies the best one that is not tabu (a tabu move is still taken if it
+    beats the best pairwise total seen so far). A vacated day stays tabu for
+    the exam for up to `tenure` iterations plus 0.6 x the number of clashing
+    exams. Fixed exams never move. With `slot_seats` (seats per day), an exam
+    only moves to a day that still has enough free seats for it.
+
+    The search stops when the wall-clock `time_budget` (seconds) is spent,
+    after `max_iterations`, when `should_stop()` returns True, or when no
+    conflicts are left. Returns (best_exam_days, total_conflicts,
+    impacted_students) for the best assignment found, ranked by total
+    conflicts then impacted students.
+    """
+    deadline = time.monotonic() + time_budget
+    state = ConflictState(index, exam_days, num_days)
+    best = (state.total_conflicts, state.impacted_students)
+    best_days = state.exam_days.copy()
+    best_pairs = state.pair_conflicts
+    if num_days < 2:
+        return best_days, best[0], best[1]
+
+    rng = np.random.default_rng(seed)
+    movable = np.flatnonzero(state.exam_days >= 0)
+    movable = movable[~np.isin(movable, np.asarray(fixed_codes, dtype=np.int64))]
+    tabu_until = np.zeros((index.num_exams, num_days), dtype=np.int64)
+    sizes = index.exam_sizes
+    if slot_seats is not None:
+        placed = state.exam_days >= 0
+        free_seats = slot_seats - np.bincount(state.exam_days[placed], weights=sizes[placed],
+                                              minlength=num_days).astype(np.int64)
+    iteration = 0
+    while best[0] > 0:
+        if time.monotonic() >= deadline:
+            break
+        if max_iterations is not None and iteration >= max_iterations:
+            break
+        if should_stop is not None and should_stop():
+            break
+        iteration += 1
+
+        clashing = movable[state.cost[movable, state.exam_days[movable]] > 0]
+        if len(clashing) == 0:
+            break
+        # TabuCol-style tenure: grows with the number of clashing exams.
+        move_tenure = int(rng.integers(0, tenure + 1)) + int(0.6 * len(clashing))
+        if len(clashing) > sample_size:
+            clashing = rng.choice(clashing, sample_size, replace=False)
+        current = state.exam_days[clashing]
+        rows = np.arange(len(clashing))
+        delta = state.cost[clashing] - state.cost[clashing, current][:, None]
+        allowed = (tabu_until[clashing] <= iteration) | (state.pair_conflicts + delta < best_pairs)
+        if slot_seats is not None:
+            allowed &= free_seats >= sizes[clashing][:, None]
+        allowed[rows, current] = False
+        if not allowed.any():
+            continue
+        # Random fractions only break ties between equal integer deltas.
+        score = np.where(allowed, delta + rng.random(delta.shape), np.inf)
+        row, day = np.unravel_index(int(np.argmin(score)), score.shape)
+        exam_code = int(clashing[row])
+
+        tabu_until[exam_code, current[row]] = iteration + move_tenure
+        state.move(exam_code, int(day))
+        if slot_seats is not None:
+            free_seats[current[row]] += sizes[exam_code]
+            free_seats[day] -= sizes[exam_code]
+        best_pairs = min(best_pairs, state.pair_conflicts)
+        if (state.total_conflicts, state.impacted_students) < best:
+            best = (state.total_conflicts, state.impacted_students)
+            best_days = state.exam_days.copy()
+    return best_days, best[0], best[1]
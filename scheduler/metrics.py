@@ -0,0 +1,142 @@
+# scheduler/metrics.py
+
+import contextvars
+import cProfile
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Recorder of the run in progress (None when nothing is being recorded). A
+# context variable keeps concurrent requests in threads apart.
+_current = contextvars.ContextVar("scheduler_metrics", default=None)
+
+
+class Recorder:
+    """
+    Collects how long each named stage of a run took (seconds, summed if a
+    stage runs more than once) and named counters (exams, students, days
+    tried, extension iterations, conflicts, ...).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    def add_time(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_count(self, name, amount):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self):
+        return {"stages": dict(self.stages), "counters": dict(self.counters)}
+
+
+@contextmanager
+def recording(recorder=None):
+    """
+    Records the stages and counters of the code run inside the block into
+    `recorder` (a new Recorder by default), which is what the block receives.
+    """
+    recorder = recorder or Recorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Times the block as stage `name` if a recording is active."""
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start)
+
+
+def count(name, amount=1):
+    """Adds `amount` to counter `name` if a recording is active."""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.add_count(name, int(amount))
+
+
+def active():
+    """Returns True if a recording is active (to skip work only metrics need)."""
+    return _current.get() is not None
+
+
+class StageClock:
+    """
+    Times consecutive stages of one function without wrapping each in a
+    block: lap(name) charges the time since the previous lap (or since the
+    clock was created) to stage `name`. Does nothing if no recording is active.
+    """
+
+    def __init__(self):
+        self.recorder = _current.get()
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        if self.recorder is None:
+            return
+        now = time.perf_counter()
+        self.recorder.add_time(name, now - self.last)
+        self.last = now
+
+
+@contextmanager
+def profiled(path):
+    """Runs the block under cProfile and dumps the stats to `path` (pstats format)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+class MetricsLog:
+    """
+    Thread-safe log of the last `max_entries` recorded runs, each a dict with
+    "stages" and "counters" plus whatever the caller adds (path, status, ...).
+    """
+
+    def __init__(self, max_entries=200):
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+
+def summarize(entries):
+    """
+    Aggregates the "stages" of recorded runs into
+    {stage: {"count", "total_seconds", "max_seconds"}}.
+    """
+    summary = {}
+    for entry in entries:
+        for name, seconds in entry.get("stages", {}).items():
+            stats = summary.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+    return summary
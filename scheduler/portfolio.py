@@ -0,0 +1,170 @@
+# scheduler/portfolio.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .conflict_graph import ConflictGraph
+from .enrollment import EnrollmentIndex, as_enrollment_index
+from .scheduler import STRATEGIES, schedule_exams_with_options
+
+# Index arrays placed in shared memory; workers map them read-only instead of
+# receiving a pickled copy with every task.
+_SHARED_ARRAYS = ("exam_ptr", "exam_student_codes", "graph_indptr", "graph_indices", "graph_weights")
+
+# EnrollmentIndex rebuilt once per worker process by _attach_index.
+_worker_index = None
+_worker_blocks = []
+
+
+def _share_index(index):
+    """
+    Copies the index and conflict-graph arrays into shared memory blocks.
+    Returns (blocks, spec) where spec is the picklable description the workers
+    need to attach to them.
+    """
+    graph = index.conflict_graph
+    arrays = {
+        "exam_ptr": index.exam_ptr,
+        "exam_student_codes": index.exam_student_codes,
+        "graph_indptr": graph.indptr,
+        "graph_indices": graph.indices,
+        "graph_weights": graph.weights,
+    }
+    blocks = []
+    spec = {
+        "exams": index.exams,
+        "courses": index.courses,
+        "num_students": index.num_students,
+        "arrays": {},
+    }
+    for name in _SHARED_ARRAYS:
+        array = np.ascontiguousarray(arrays[name])
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        spec["arrays"][name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def _attach_index(spec):
+    """Worker initializer: maps the shared arrays and rebuilds the index around them."""
+    global _worker_index
+    arrays = {}
+    for name, (block_name, shape, dtype) in spec["arrays"].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    # Student IDs are never needed by the scheduler itself, only their count.
+    index = EnrollmentIndex(
+        exams=spec["exams"],
+        students=range(spec["num_students"]),
+        courses=spec["courses"],
+        exam_ptr=arrays["exam_ptr"],
+        exam_student_codes=arrays["exam_student_codes"],
+    )
+    index.conflict_graph = ConflictGraph(
+        index, arrays["graph_indptr"], arrays["graph_indices"], arrays["graph_weights"])
+    _worker_index = index
+
+
+def _run_one(params):
+    (first_date, last_date, excluded_dates, fixed_schedules, strategy, seed, improve_seconds,
+     slots_per_day, rooms, soft_constraints) = params
+    return schedule_exams_with_options(_worker_index, first_date, last_date, excluded_dates,
+                                       fixed_schedules, strategy=strategy,
+                                       improve_seconds=improve_seconds, seed=seed,
+                                       slots_per_day=slots_per_day, rooms=rooms,
+                                       soft_constraints=soft_constraints)
+
+
+def _adopt(result, index):
+    """Points the Schedules a worker returned at `index`'s exam list, as a local run would."""
+    for which in ("extended_solution", "conflict_solution"):
+        schedule = result[which]["schedule"]
+        schedule.exams = index.exams
+        schedule._exam_code = index.exam_code
+    return result
+
+
+def _span(schedule):
+    if not len(schedule):
+        return 0
+    return (schedule.last_date - schedule.first_date).days
+
+
+def _penalty(solution):
+    load = solution["student_load"]
+    return 0 if load is None else load["penalty"]
+
+
+def portfolio_runs(num_runs):
+    """
+    Returns the (strategy, seed) pairs of a portfolio of `num_runs` runs: each
+    strategy once deterministically, then seeded variants in turn.
+    """
+    runs = []
+    for i in range(num_runs):
+        strategy = STRATEGIES[i % len(STRATEGIES)]
+        runs.append((strategy, None if i < len(STRATEGIES) else i))
+    return runs
+
+
+def schedule_exams_portfolio(data, first_date, last_date, excluded_dates, fixed_schedules,
+                             num_runs=None, workers=None, improve_seconds=0.0, slots_per_day=1, rooms=None,
+                             soft_constraints=None):
+    """
+    Runs schedule_exams_with_options with several strategies and seeds (see
+    portfolio_runs) across a process pool and keeps the best result.
+    `improve_seconds`, `slots_per_day`, `rooms` and `soft_constraints` are
+    passed on to every run.
+
+    The enrollment index and conflict graph are built once here and shared
+    with the workers through shared memory. The extended solution is taken
+    from the run with the earliest extended_last_date, the conflict-minimized
+    solution from the run with the fewest total conflicts, then impacted
+    students; remaining ties go to the lowest student-load penalty (with
+    soft_constraints), then the shortest span. Returns a dictionary shaped
+    like the result of schedule_exams_with_options.
+    """
+    workers = workers or os.cpu_count() or 1
+    runs = portfolio_runs(num_runs or workers)
+    index = as_enrollment_index(data)
+    params = [(first_date, last_date, excluded_dates, fixed_schedules, strategy, seed, improve_seconds,
+               slots_per_day, rooms, soft_constraints)
+              for strategy, seed in runs]
+
+    if workers == 1 or len(runs) == 1:
+        results = [schedule_exams_with_options(index, first_date, last_date, excluded_dates,
+                                               fixed_schedules, strategy=strategy,
+                                               improve_seconds=improve_seconds, seed=seed,
+                                               slots_per_day=slots_per_day, rooms=rooms,
+                                               soft_constraints=soft_constraints)
+                   for strategy, seed in runs]
+    else:
+        blocks, spec = _share_index(index)
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(runs)), initializer=_attach_index,
+                                     initargs=(spec,)) as pool:
+                results = [_adopt(result, index) for result in pool.map(_run_one, params)]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    best_extended = min(results, key=lambda r: (r["extended_solution"]["extended_last_date"],
+                                                _penalty(r["extended_solution"]),
+                                                _span(r["extended_solution"]["schedule"])))
+    best_conflict = min(results, key=lambda r: (r["conflict_solution"]["total_conflicts"],
+                                                r["conflict_solution"]["impacted_students"],
+                                                _penalty(r["conflict_solution"]),
+                                                _span(r["conflict_solution"]["schedule"])))
+    return {
+        "normal_complete": any(r["normal_complete"] for r in results),
+        "extended_solution": best_extended["extended_solution"],
+        "conflict_solution": best_conflict["conflict_solution"],
+    }
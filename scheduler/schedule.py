@@ -0,0 +1,303 @@
+# scheduler/schedule.py
+
+import calendar
+import hashlib
+import io
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .capacity import slot_label
+
+
+class _ExamView(Mapping):
+    """
+    Read-only {exam: value} mapping over a Schedule, in schedule order. Values
+    are built on access, so handing out exam_dates / exam_slots / exam_rooms
+    does not materialise a dictionary.
+    """
+
+    __slots__ = ("_schedule", "_value")
+
+    def __init__(self, schedule, value):
+        self._schedule = schedule
+        self._value = value
+
+    def __getitem__(self, exam):
+        code = self._schedule.code_of(exam)
+        if code is None:
+            raise KeyError(exam)
+        return self._value(self._schedule, code)
+
+    def __iter__(self):
+        exams = self._schedule.exams
+        return (exams[code] for code in self._schedule.order.tolist())
+
+    def __len__(self):
+        return len(self._schedule.order)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+def _date_of(schedule, code):
+    return schedule.origin + timedelta(days=int(schedule.days[code]))
+
+
+def _session_of(schedule, code):
+    return int(schedule.sessions[code])
+
+
+def _rooms_of(schedule, code):
+    return schedule.rooms.get(code, "")
+
+
+class Schedule:
+    """
+    A solution as arrays over exam codes instead of {exam: datetime}
+    dictionaries:
+
+      exams            exam IDs by code (EnrollmentIndex.exams).
+      origin           datetime of day offset 0.
+      days[c]          day offset of exam code c from origin, -1 if unscheduled.
+      sessions[c]      session of the day of exam code c (0 with one a day).
+      order            scheduled exam codes in placement order, which is the
+                       order of every view (ties in rows(), cells of a month).
+      rooms            {exam code: "room, ..."} for exams seated in rooms.
+
+    exam_dates / exam_slots / exam_rooms are lazy mappings with the shape of
+    the dictionaries the scheduler used to return, and dates are turned into
+    strings once per distinct day. to_arrays() / from_arrays() (and
+    to_bytes() / from_bytes()) serialise the scheduled exams only, keyed by
+    exam ID (integer IDs stay integers), so a stored schedule can be read
+    back without the index.
+    """
+
+    __slots__ = ("exams", "origin", "days", "sessions", "slots_per_day", "order", "rooms", "_exam_code")
+
+    def __init__(self, exams, origin, days, sessions=None, slots_per_day=1, order=None, rooms=None,
+                 exam_code=None):
+        self.exams = exams
+        self.origin = origin
+        self.days = np.asarray(days, dtype=np.int32)
+        self.sessions = (np.zeros(len(self.days), dtype=np.int8) if sessions is None
+                         else np.asarray(sessions, dtype=np.int8))
+        self.slots_per_day = slots_per_day
+        self.order = (np.flatnonzero(self.days >= 0) if order is None
+                      else np.asarray(order, dtype=np.int64)).astype(np.int32)
+        self.rooms = rooms or {}
+        self._exam_code = exam_code
+
+    @classmethod
+    def from_slots(cls, index, origin, offsets, slots_per_day=1, order=None, rooms=None):
+        """
+        Builds a schedule of `index` from slot offsets (day offset *
+        slots_per_day + session from `origin`, -1 if unscheduled).
+        """
+        offsets = np.asarray(offsets)
+        placed = offsets >= 0
+        return cls(index.exams, origin, np.where(placed, offsets // slots_per_day, -1),
+                   np.where(placed, offsets % slots_per_day, 0), slots_per_day, order, rooms,
+                   index.exam_code)
+
+    @classmethod
+    def from_dates(cls, index, exam_dates, exam_slots=None, exam_rooms=None, slots_per_day=1):
+        """Builds a schedule of `index` from {exam: date} (and {exam: session}, {exam: rooms})."""
+        exam_code = index.exam_code
+        exam_slots = exam_slots or {}
+        exam_rooms = exam_rooms or {}
+        origin = min(exam_dates.values()) if exam_dates else datetime(1970, 1, 1)
+        days = np.full(index.num_exams, -1, dtype=np.int32)
+        sessions = np.zeros(index.num_exams, dtype=np.int8)
+        order = []
+        for exam, day in exam_dates.items():
+            code = exam_code[exam]
+            days[code] = (day - origin).days
+            sessions[code] = exam_slots.get(exam, 0)
+            order.append(code)
+        rooms = {exam_code[e]: names for e, names in exam_rooms.items() if names}
+        return cls(index.exams, origin, days, sessions, slots_per_day, order, rooms, exam_code)
+
+    def code_of(self, exam):
+        """Code of a scheduled exam, None if it is not scheduled."""
+        if self._exam_code is None:
+            self._exam_code = {exam: code for code, exam in enumerate(self.exams)}
+        code = self._exam_code.get(exam)
+        if code is None or code >= len(self.days) or self.days[code] < 0:
+            return None
+        return code
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def exam_dates(self):
+        """{exam: datetime} view."""
+        return _ExamView(self, _date_of)
+
+    @property
+    def exam_slots(self):
+        """{exam: session of the day} view."""
+        return _ExamView(self, _session_of)
+
+    @property
+    def exam_rooms(self):
+        """{exam: "room, ..."} view (every scheduled exam; "" without rooms)."""
+        return _ExamView(self, _rooms_of)
+
+    @property
+    def first_date(self):
+        return self.origin + timedelta(days=int(self.days[self.order].min())) if len(self.order) else None
+
+    @property
+    def last_date(self):
+        return self.origin + timedelta(days=int(self.days[self.order].max())) if len(self.order) else None
+
+    def ordinals(self):
+        """Proleptic Gregorian ordinal of each scheduled exam's day, in order."""
+        return self.days[self.order].astype(np.int64) + self.origin.toordinal()
+
+    def slot_numbers(self):
+        """Day ordinal * slots_per_day + session of each scheduled exam, in order."""
+        return self.ordinals() * self.slots_per_day + self.sessions[self.order]
+
+    def date_strings(self, with_sessions=False):
+        """
+        "YYYY-MM-DD" of each scheduled exam, in order, formatting each distinct
+        day once; with_sessions appends the session label ("2025-05-12 AM")
+        when there are several sessions a day.
+        """
+        if with_sessions and self.slots_per_day > 1:
+            keys = self.days[self.order].astype(np.int64) * self.slots_per_day + self.sessions[self.order]
+        else:
+            keys = self.days[self.order].astype(np.int64)
+            with_sessions = False
+        uniques, inverse = np.unique(keys, return_inverse=True)
+        spd = self.slots_per_day if with_sessions else 1
+        labels = []
+        for key in uniques.tolist():
+            label = (self.origin + timedelta(days=key // spd)).strftime("%Y-%m-%d")
+            if with_sessions:
+                label = f"{label} {slot_label(key % spd, spd)}"
+            labels.append(label)
+        return [labels[i] for i in inverse.tolist()]
+
+    def _sorted_order(self):
+        # Stable, so ties keep the placement order.
+        order = self.order
+        return order[np.lexsort((self.sessions[order], self.days[order]))]
+
+    def rows(self, index):
+        """
+        The final_schedule list [(date, exam, course, #_students, session,
+        rooms), ...], sorted by date and session.
+        """
+        exams, exam_course, sizes, rooms = self.exams, index.exam_course, index.exam_sizes, self.rooms
+        order = self._sorted_order()
+        dates = {}
+        rows = []
+        for code, day, session in zip(order.tolist(), self.days[order].tolist(), self.sessions[order].tolist()):
+            date = dates.get(day)
+            if date is None:
+                date = dates[day] = self.origin + timedelta(days=day)
+            exam = exams[code]
+            rows.append((date, exam, exam_course[exam], int(sizes[code]), session, rooms.get(code, "")))
+        return rows
+
+    def string_rows(self, index):
+        """
+        rows() with the date as "YYYY-MM-DD" and the session as its label
+        ("" with one session a day), as stored and exported by the web app.
+        """
+        exams, exam_course, sizes, rooms = self.exams, index.exam_course, index.exam_sizes, self.rooms
+        order = self._sorted_order()
+        dates = {}
+        labels = [slot_label(s, self.slots_per_day) for s in range(self.slots_per_day)]
+        rows = []
+        for code, day, session in zip(order.tolist(), self.days[order].tolist(), self.sessions[order].tolist()):
+            date = dates.get(day)
+            if date is None:
+                date = dates[day] = (self.origin + timedelta(days=day)).strftime("%Y-%m-%d")
+            exam = exams[code]
+            rows.append((date, exam, exam_course[exam], int(sizes[code]), labels[session], rooms.get(code, "")))
+        return rows
+
+    def by_date(self):
+        """[(date, [exam, ...]), ...] sorted by date, exams in placement order."""
+        order = self.order[np.argsort(self.days[self.order], kind="stable")]
+        days = self.days[order]
+        starts = np.flatnonzero(np.append(True, days[1:] != days[:-1])) if len(order) else []
+        bounds = np.append(starts, len(order))
+        exams = self.exams
+        return [(self.origin + timedelta(days=int(days[lo])), [exams[c] for c in order[lo:hi].tolist()])
+                for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+    def months(self):
+        """(year, month) pairs from the first to the last scheduled date."""
+        if not len(self.order):
+            return []
+        first, last = self.first_date, self.last_date
+        return [(n // 12, n % 12 + 1) for n in range(first.year * 12 + first.month - 1, last.year * 12 + last.month)]
+
+    def month(self, year, month):
+        """{day of month: [exam, ...]} of the exams in a month, in placement order."""
+        first = datetime(year, month, 1).toordinal()
+        ordinals = self.ordinals()
+        inside = np.flatnonzero((ordinals >= first) & (ordinals < first + calendar.monthrange(year, month)[1]))
+        exams = self.exams
+        day_exams = {}
+        for code, ordinal in zip(self.order[inside].tolist(), ordinals[inside].tolist()):
+            day_exams.setdefault(ordinal - first + 1, []).append(exams[code])
+        return day_exams
+
+    def to_arrays(self):
+        """The scheduled exams as plain arrays (see from_arrays)."""
+        order = self.order
+        exams = [self.exams[c] for c in order.tolist()]
+        # Integer IDs (numeric columns of the input) are kept as integers so
+        # that they still match the index after a round trip.
+        is_int = [isinstance(e, (int, np.integer)) and not isinstance(e, bool) for e in exams]
+        arrays = {
+            "exams": (np.asarray(exams, dtype=np.int64) if exams and all(is_int)
+                      else np.asarray([str(e) for e in exams])),
+            "days": self.days[order],
+            "sessions": self.sessions[order],
+            "origin": np.asarray(self.origin.toordinal(), dtype=np.int64),
+            "slots_per_day": np.asarray(self.slots_per_day, dtype=np.int64),
+        }
+        if any(is_int) and not all(is_int):
+            arrays["int_exams"] = np.asarray(is_int)
+        if self.rooms:
+            arrays["rooms"] = np.asarray([self.rooms.get(c, "") for c in order.tolist()])
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Inverse of to_arrays; exam codes are positions in the stored order."""
+        exams = arrays["exams"].tolist()
+        if "int_exams" in arrays:
+            exams = [int(e) if is_int else e for e, is_int in zip(exams, arrays["int_exams"].tolist())]
+        rooms = {}
+        if "rooms" in arrays:
+            rooms = {code: names for code, names in enumerate(arrays["rooms"].tolist()) if names}
+        return cls(exams, datetime.fromordinal(int(arrays["origin"])), arrays["days"], arrays["sessions"],
+                   int(arrays["slots_per_day"]), rooms=rooms)
+
+    def digest(self):
+        """SHA-256 hex digest of to_arrays(), which changes with any exam, day, session or room."""
+        sha = hashlib.sha256()
+        for name, array in sorted(self.to_arrays().items()):
+            sha.update(f"{name}:{array.dtype.str}:{array.shape}|".encode("utf-8"))
+            sha.update(np.ascontiguousarray(array).tobytes())
+        return sha.hexdigest()
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez(buffer, **self.to_arrays())
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, blob):
+        with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+            return cls.from_arrays({name: arrays[name] for name in arrays.files})
@@ -1,15 +1,77 @@
 # scheduler/scheduler.py
 
-import pandas as pd
+import importlib.util
+import os
+
+import numpy as np
 from datetime import datetime, timedelta
 from collections import Counter
+import heapq
+
+from .capacity import SlotCapacity, slot_label
+from .enrollment import as_enrollment_index, update_enrollment_index
+from .local_search import tabu_search
+from .metrics import StageClock, active, count, stage
+from .schedule import Schedule
+from .student_load import StudentLoad
+
+# The only columns the scheduler uses; everything else in an upload is skipped.
+REQUIRED_COLUMNS = ['Student ID', 'Exam ID', 'Course Name']
+
+def _excel_engine():
+    """
+    Returns the fastest installed engine for reading .xlsx files.
+    """
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+def _input_format(filepath):
+    """
+    Returns "excel", "csv" or "parquet" for a path or an uploaded file, from its
+    extension or, failing that, from its first bytes.
+    """
+    name = getattr(filepath, "filename", None) or getattr(filepath, "name", None) or filepath
+    extension = os.path.splitext(str(name))[1].lower()
+    if extension in (".xlsx", ".xlsm", ".xls"):
+        return "excel"
+    if extension in (".csv", ".txt"):
+        return "csv"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    if hasattr(filepath, "read"):
+        stream = getattr(filepath, "stream", filepath)
+        position = stream.tell()
+        magic = stream.read(4)
+        stream.seek(position)
+    else:
+        with open(filepath, "rb") as f:
+            magic = f.read(4)
+    if magic == b"PAR1":
+        return "parquet"
+    if magic.startswith(b"PK"):
+        return "excel"
+    return "csv"
 
 def read_and_analyze_data(filepath):
     """
-    Reads the Excel file and returns a DataFrame.
+    Reads the registrations from an Excel (.xlsx), CSV or Parquet file and
+    returns a DataFrame with only the REQUIRED_COLUMNS, each cast to a
+    categorical dtype. Excel files are read with python-calamine when it is
+    installed and openpyxl otherwise; Parquet needs pyarrow. pandas (and the
+    Excel engine) are only imported here, on the first read.
     """
-    data = pd.read_excel(filepath, engine='openpyxl')
-    return data
+    import pandas as pd
+    with stage("ingest"):
+        file_format = _input_format(filepath)
+        if file_format == "parquet":
+            data = pd.read_parquet(getattr(filepath, "stream", filepath), columns=REQUIRED_COLUMNS)
+        elif file_format == "csv":
+            data = pd.read_csv(filepath, usecols=REQUIRED_COLUMNS)
+        else:
+            data = pd.read_excel(filepath, engine=_excel_engine(), usecols=REQUIRED_COLUMNS)
+        count("registrations", len(data))
+        return data[REQUIRED_COLUMNS].astype("category")
 
 def find_weekdays(start_date, end_date, excluded_dates=[]):
     """
@@ -24,14 +86,279 @@ def find_weekdays(start_date, end_date, excluded_dates=[]):
         current_date += timedelta(days=1)
     return weekdays
 
-def schedule_exams_with_options(data, first_date, last_date, excluded_dates, fixed_schedules):
+def _day_mask(days, origin, slots_per_day=1):
+    """
+    Returns a bitmask with the bits of every day in `days`: bit (day - origin).days,
+    or with several slots per day the bits (day - origin).days * slots_per_day + s.
+    """
+    day_bits = (1 << slots_per_day) - 1
+    mask = 0
+    for day in days:
+        mask |= day_bits << (day - origin).days * slots_per_day
+    return mask
+
+def _weekday_mask(origin, start, stop, excluded, slots_per_day=1):
+    """
+    Returns a bitmask with bit k set for every slot k in [start, stop) whose
+    date (origin + k // slots_per_day days) is a weekday not in the `excluded` set.
+    """
+    mask = 0
+    for offset in range(start, stop):
+        day = origin + timedelta(days=offset // slots_per_day)
+        if day.weekday() < 5 and day not in excluded:
+            mask |= 1 << offset
+    return mask
+
+def _lowest_bit(mask):
+    """
+    Returns the index of the lowest set bit of `mask`, or None if it is zero.
+    """
+    if not mask:
+        return None
+    return (mask & -mask).bit_length() - 1
+
+def _first_fit(candidates, capacity, size):
+    """
+    Returns the lowest slot set in the `candidates` bitmask that can still
+    seat `size` students in `capacity` (a SlotCapacity, or None for unlimited
+    seats), or None. Alternates between the next candidate bit and the next
+    slot with enough seats until both agree.
+    """
+    slot = _lowest_bit(candidates)
+    if capacity is None:
+        return slot
+    while slot is not None:
+        fit = capacity.first_fit(size, slot)
+        if fit == slot:
+            return slot
+        slot = _lowest_bit(candidates >> fit << fit)
+    return None
+
+def _least_penalty_fit(candidates, capacity, size, day_costs, slots_per_day):
+    """
+    Like _first_fit, but returns the candidate slot whose day has the lowest
+    of `day_costs` (StudentLoad.insertion_costs), the earliest on ties.
+    """
+    best, best_cost = None, None
+    slot = _first_fit(candidates, capacity, size)
+    while slot is not None:
+        cost = day_costs[slot // slots_per_day]
+        if best is None or cost < best_cost:
+            best, best_cost = slot, cost
+        slot = _first_fit(candidates >> (slot + 1) << (slot + 1), capacity, size)
+    return best
+
+def _count_conflicts(index, exam_days):
+    """
+    Given an array of day numbers per exam code (-1 for unscheduled exams),
+    returns (total_conflicts, impacted_students): every exam beyond the first
+    that a student sits on the same day counts as one conflict.
+    """
+    exam_codes = np.repeat(np.arange(index.num_exams), index.exam_sizes)
+    days = exam_days[exam_codes]
+    placed = days >= 0
+    students = index.exam_student_codes[placed]
+    days = days[placed]
+    if len(days) == 0:
+        return 0, 0
+    num_days = int(days.max()) + 1
+    key, counts = np.unique(students * num_days + days, return_counts=True)
+    clashing = counts > 1
+    total_conflicts = int((counts[clashing] - 1).sum())
+    impacted_students = len(np.unique(key[clashing] // num_days))
+    return total_conflicts, impacted_students
+
+# Orderings available for the conflict-free (normal) placement:
+#   largest_first - largest enrolment first, then first-fit.
+#   welsh_powell  - most conflicting exams (graph degree) first, then first-fit.
+#   dsatur        - repeatedly place the exam whose neighbours already occupy the
+#                   most distinct days (saturation degree), ties by degree.
+STRATEGIES = ("largest_first", "welsh_powell", "dsatur")
+
+def _place_dsatur(graph, exam_codes, exam_sizes, available_mask, exam_offsets, tie_rank, capacity=None,
+                  student_load=None, slots_per_day=1):
+    """
+    Places the given exam codes first-fit in DSatur order, using a heap keyed on
+    (saturation, degree, enrolment, tie_rank) with lazy deletion of stale entries. Exams
+    already in `exam_offsets` (e.g. fixed ones) act as pre-coloured vertices.
+    With a SlotCapacity, only slots that can still seat the exam are used; with
+    a StudentLoad, the free slot with the lowest soft-constraint penalty is
+    taken instead of the first one (and the load is updated).
+    Updates `exam_offsets` in place and returns [(exam_code, offset), ...] in
+    placement order; exams with no free available slot are left out.
+    """
+    degrees = graph.degrees
+    neighbour_days = {code: graph.blocked_days(code, exam_offsets) for code in exam_codes}
+    
+    def entry(code):
+        return (-neighbour_days[code].bit_count(), -int(degrees[code]), -int(exam_sizes[code]),
+                int(tie_rank[code]), code)
+    
+    heap = [entry(code) for code in exam_codes]
+    heapq.heapify(heap)
+    pending = set(exam_codes)
+    placed = []
+    while heap:
+        neg_saturation, _, _, _, code = heapq.heappop(heap)
+        if code not in pending or -neg_saturation != neighbour_days[code].bit_count():
+            continue
+        pending.discard(code)
+        if student_load is None:
+            offset = _first_fit(available_mask & ~neighbour_days[code], capacity, exam_sizes[code])
+        else:
+            offset = _least_penalty_fit(available_mask & ~neighbour_days[code], capacity, exam_sizes[code],
+                                        student_load.insertion_costs(code), slots_per_day)
+        if offset is None:
+            continue
+        if capacity is not None:
+            capacity.take(offset, int(exam_sizes[code]), code)
+        if student_load is not None:
+            student_load.add(code, offset // slots_per_day)
+        exam_offsets[code] = offset
+        placed.append((code, offset))
+        bit = 1 << offset
+        for neighbour in graph.neighbours(code).tolist():
+            if neighbour in pending and not neighbour_days[neighbour] & bit:
+                neighbour_days[neighbour] |= bit
+                heapq.heappush(heap, entry(neighbour))
+    return placed
+
+def _place_after(graph, exam_codes, exam_offsets, first_date, start, excluded, slots_per_day=1,
+                 capacity=None, exam_sizes=None):
+    """
+    Places each exam code, in order, on the earliest weekday slot >= start
+    that is not on a date in the `excluded` set, not taken by one of its
+    neighbours and (with a SlotCapacity) can still seat it. Updates
+    `exam_offsets` in place and returns how many times the search window past
+    `start` had to be widened.
+    """
+    horizon = start + 7 * slots_per_day
+    allowed = _weekday_mask(first_date, start, horizon, excluded, slots_per_day)
+    extensions = 0
+    for code in exam_codes:
+        blocked = graph.blocked_days(code, exam_offsets)
+        size = None if capacity is None else int(exam_sizes[code])
+        offset = _first_fit(allowed & ~blocked, capacity, size)
+        while offset is None:
+            allowed |= _weekday_mask(first_date, horizon, 2 * horizon, excluded, slots_per_day)
+            horizon *= 2
+            extensions += 1
+            offset = _first_fit(allowed & ~blocked, capacity, size)
+        if capacity is not None:
+            capacity.take(offset, size, code)
+        exam_offsets[code] = offset
+    return extensions
+
+def _place_least_conflict(graph, exam_codes, exam_days, conflict_cost, free_seats=None, exam_sizes=None,
+                          student_load=None, calendar_days=None):
+    """
+    Places each exam code, in order, on the day with the fewest clashing
+    students according to `conflict_cost` (exam x day, see
+    ConflictGraph.day_costs), then adds its shared-student counts to its
+    neighbours' rows. With `free_seats` (seats left per day), days that cannot
+    seat the exam are only used if no day can. With a StudentLoad, ties are
+    broken by the lowest soft-constraint penalty; `calendar_days` gives the
+    StudentLoad day of every day index. Updates `exam_days`, `conflict_cost`,
+    `free_seats` and `student_load` in place.
+    """
+    for code in exam_codes:
+        tie_costs = None if student_load is None else student_load.insertion_costs(code)[calendar_days]
+        day = _cheapest_day(conflict_cost[code], free_seats, None if exam_sizes is None else exam_sizes[code],
+                            tie_costs)
+        if free_seats is not None:
+            free_seats[day] -= exam_sizes[code]
+        if student_load is not None:
+            student_load.add(code, int(calendar_days[day]))
+        exam_days[code] = day
+        conflict_cost[graph.neighbours(code), day] += graph.neighbour_weights(code)
+
+def _cheapest_day(costs, free_seats, size, tie_costs=None):
+    """
+    Index of the lowest of `costs`, among the days with at least `size` free
+    seats if `free_seats` is given and any day has them. Ties go to the lowest
+    of `tie_costs` if given, then to the earliest day.
+    """
+    if free_seats is not None:
+        fits = free_seats >= size
+        if fits.any():
+            costs = np.where(fits, costs, np.iinfo(np.int64).max)
+    if tie_costs is None:
+        return int(np.argmin(costs))
+    return int(np.lexsort((tie_costs, costs))[0])
+
+def _solution_fields(index, schedule, student_load=None):
+    """
+    The entries every solution dictionary shares, derived from its Schedule:
+    the schedule itself, its exam_dates / exam_slots / exam_rooms views, the
+    final_schedule rows (sorted by date and session) and the summary of
+    `student_load` (a StudentLoad of the schedule), None without one.
+    """
+    return {
+        "schedule": schedule,
+        "exam_dates": schedule.exam_dates,
+        "exam_slots": schedule.exam_slots,
+        "exam_rooms": schedule.exam_rooms,
+        "final_schedule": schedule.rows(index),
+        "student_load": None if student_load is None else student_load.summary(),
+    }
+
+def _assign_rooms(exam_slots_by_code, exam_sizes, rooms):
+    """
+    Seats every placed exam code (slot >= 0 in `exam_slots_by_code`) in the
+    `rooms` of its slot, largest exams of a slot first. Exams that no longer
+    fit get no rooms. Returns {exam_code: (room, ...)}.
+    """
+    capacity = SlotCapacity(rooms, int(exam_slots_by_code.max(initial=0)) + 1)
+    codes = np.flatnonzero(exam_slots_by_code >= 0)
+    codes = codes[np.lexsort((-exam_sizes[codes], exam_slots_by_code[codes]))]
+    assigned = {}
+    for code in codes.tolist():
+        slot, size = int(exam_slots_by_code[code]), int(exam_sizes[code])
+        assigned[code] = capacity.take(slot, size) if capacity.remaining(slot) >= size else ()
+    return assigned
+
+def compute_student_load_summary(data, exam_dates, soft_constraints=None):
+    """
+    Soft-constraint totals (see StudentLoad.summary) of a Schedule or
+    {exam: date} of the input data (DataFrame or EnrollmentIndex), for
+    solutions scheduled without soft_constraints, whose "student_load" is None.
+    """
+    with stage("student_load"):
+        return StudentLoad.from_dates(as_enrollment_index(data), exam_dates, soft_constraints).summary()
+
+def schedule_exams_with_options(data, first_date, last_date, excluded_dates, fixed_schedules,
+                                strategy="largest_first", improve_seconds=0.0, should_stop=None,
+                                seed=None, slots_per_day=1, rooms=None, soft_constraints=None):
     """
     Attempts to schedule exams so that no student is double-booked.
+    `data` is either the registration DataFrame or a prebuilt EnrollmentIndex.
+    `strategy` selects the exam ordering used for conflict-free placement
+    (one of STRATEGIES); fixed exams are always placed first.
+    Each weekday has `slots_per_day` sessions (e.g. 2 for AM / PM); a student
+    is double-booked when two of their exams share a session. With `rooms`
+    ({room: seats}, available in every session), exams only go where enough
+    seats are left and are assigned rooms; an exam may be split over rooms.
+    Fixed exams take the first session of their day that is free for them.
+    With `soft_constraints` (settings as in student_load.SOFT_CONSTRAINTS, {}
+    for the defaults), exams within the requested range go to the free
+    session whose day adds the least student-load penalty (back-to-back days,
+    too many exams within a few days) instead of the first free one, and the
+    forced solution breaks ties between equally conflicting sessions the same
+    way, and both solutions report their student load (None otherwise; see
+    compute_student_load_summary).
+    If `improve_seconds` > 0, the conflict-minimized solution is further improved
+    by tabu search for at most that many seconds (or until `should_stop()`
+    returns True), keeping the best schedule found.
+    With a `seed`, exams that tie in the chosen ordering are taken in a random
+    (but reproducible) order instead of the order of the input; the tabu search
+    uses the same seed.
     Returns two solutions:
     
-      1. extended_solution: Schedules exams conflict-free by extending the date range (if needed).
+      1. extended_solution: Schedules exams conflict-free by extending the date range (if needed);
+         extended_last_date is the latest exam date when the range had to be extended.
       2. conflict_solution: Forces all exams into the given range even if some conflicts occur,
-         choosing days that minimize additional conflicts.
+         choosing sessions that minimize additional conflicts (and, with rooms, fit
+         the seats left if any session does; exams that fit nowhere get no rooms).
          
     Also returns a flag 'normal_complete' indicating if a conflict‑free schedule was achieved
     within the originally requested range.
@@ -40,141 +367,245 @@ def schedule_exams_with_options(data, first_date, last_date, excluded_dates, fix
        {
          "normal_complete": <True/False>,
          "extended_solution": {
+              "schedule": <Schedule>,
               "exam_dates": { exam: date, ... },
-              "final_schedule": [ (date, exam, course, #_students), ... ],
-              "extended_last_date": <datetime>
+              "exam_slots": { exam: session, ... },
+              "exam_rooms": { exam: "room, ...", ... },
+              "final_schedule": [ (date, exam, course, #_students, session, rooms), ... ],
+              "extended_last_date": <datetime>,
+              "student_load": { "back_to_back", "window_excess", "penalty", "penalized_students" } or None
          },
          "conflict_solution": {
+              "schedule": <Schedule>,
               "exam_dates": { exam: date, ... },
-              "final_schedule": [ (date, exam, course, #_students), ... ],
+              "exam_slots": { exam: session, ... },
+              "exam_rooms": { exam: "room, ...", ... },
+              "final_schedule": [ (date, exam, course, #_students, session, rooms), ... ],
               "total_conflicts": <int>,
-              "impacted_students": <int>
+              "impacted_students": <int>,
+              "student_load": { "back_to_back", "window_excess", "penalty", "penalized_students" } or None
          }
        }
+    exam_dates / exam_slots / exam_rooms are read-only views of the Schedule
+    (exam_rooms lists every scheduled exam, with "" when it has no rooms).
     """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown scheduling strategy: {strategy}")
+    if slots_per_day < 1:
+        raise ValueError("slots_per_day must be at least 1")
+    
+    # Stage timings (index, normal, extended, conflict, improve) when recording.
+    clock = StageClock()
+    
     # Build lookups.
-    exam_students = {}
-    exam_course = {}
-    for exam in data['Exam ID'].unique():
-        subset = data[data['Exam ID'] == exam]
-        exam_students[exam] = subset['Student ID'].unique().tolist()
-        exam_course[exam] = subset['Course Name'].iloc[0] if not subset.empty else "Unknown Course"
-    total_exams = len(data['Exam ID'].unique())
+    index = as_enrollment_index(data)
+    all_exams = index.exams
+    exam_code = index.exam_code
+    total_exams = len(all_exams)
+    # Students per exam code, from the CSR offsets.
+    sizes = index.exam_sizes
+    if seed is None:
+        tie_rank = np.arange(index.num_exams)
+    else:
+        tie_rank = np.random.default_rng(seed).permutation(index.num_exams)
+    
+    def by_size(exams):
+        return sorted(exams, key=lambda e: (-sizes[exam_code[e]], tie_rank[exam_code[e]]))
+    
+    # Sessions are numbered day offset * slots_per_day + session of the day
+    # ("slots"); with one session a day a slot is simply the day offset.
+    slots = slots_per_day
+    if rooms:
+        seats = sum(rooms.values())
+        if index.num_exams and sizes.max() > seats:
+            largest = all_exams[int(np.argmax(sizes))]
+            raise ValueError(f"Exam {largest} has {int(sizes.max())} students but a session "
+                             f"only seats {seats}.")
+    
+    def room_names(assigned):
+        return {code: ", ".join(names) for code, names in assigned.items()}
+    count("exams", index.num_exams)
+    count("students", index.num_students)
+    clock.lap("index")
 
     ### NORMAL SOLUTION: Try to schedule conflict-free within first_date and last_date.
+    # Slots are bit offsets from first_date. An exam can go in any available slot
+    # that none of its conflict-graph neighbours already occupies (and, with
+    # rooms, that still has the seats for it).
     available_days = find_weekdays(first_date, last_date, excluded_dates)
-    exam_dates_normal = {}
-    student_schedule_normal = {student: set() for student in data['Student ID'].unique()}
+    available_mask = _day_mask(available_days, first_date, slots)
+    graph = index.conflict_graph
+    capacity = SlotCapacity(rooms, ((last_date - first_date).days + 1) * slots) if rooms else None
+    # Calendar days of the requested range, as StudentLoad days.
+    range_days = max((last_date - first_date).days + 1, 1)
+    if soft_constraints is not None:
+        student_load = StudentLoad(index, np.full(index.num_exams, -1), range_days, soft_constraints)
+    else:
+        student_load = None
+    # Placed exam codes in placement order, the order of the Schedule views.
+    order_normal = []
+    exam_offsets_normal = np.full(index.num_exams, -1)
     
     # Fixed exams first.
     for exam, fixed_day in fixed_schedules.items():
-        if fixed_day not in available_days:
+        if fixed_day not in available_days or exam not in exam_code:
             continue
-        conflict = False
-        for student in exam_students.get(exam, []):
-            if fixed_day in student_schedule_normal[student]:
-                conflict = True
-                break
-        if not conflict:
-            exam_dates_normal[exam] = fixed_day
-            for student in exam_students[exam]:
-                student_schedule_normal[student].add(fixed_day)
+        code = exam_code[exam]
+        day_slots = ((1 << slots) - 1) << (fixed_day - first_date).days * slots
+        offset = _first_fit(day_slots & ~graph.blocked_days(code, exam_offsets_normal), capacity, sizes[code])
+        if offset is not None:
+            if capacity is not None:
+                capacity.take(offset, int(sizes[code]), code)
+            if student_load is not None:
+                student_load.add(code, offset // slots)
+            order_normal.append(code)
+            exam_offsets_normal[code] = offset
     
     # Schedule remaining exams.
-    remaining_exams = [e for e in data['Exam ID'].unique() if e not in exam_dates_normal]
-    remaining_exams.sort(key=lambda e: len(exam_students[e]), reverse=True)
-    for exam in remaining_exams:
-        placed = False
-        for day in available_days:
-            if all(day not in student_schedule_normal[student] for student in exam_students[exam]):
-                exam_dates_normal[exam] = day
-                for student in exam_students[exam]:
-                    student_schedule_normal[student].add(day)
-                placed = True
-                break
+    remaining_exams = [e for e in all_exams if exam_offsets_normal[exam_code[e]] < 0]
+    if strategy == "dsatur":
+        placed = _place_dsatur(graph, [exam_code[e] for e in remaining_exams], sizes,
+                               available_mask, exam_offsets_normal, tie_rank, capacity, student_load, slots)
+        order_normal += [code for code, _ in placed]
+    else:
+        if strategy == "welsh_powell":
+            degrees = graph.degrees
+            remaining_exams.sort(key=lambda e: (-degrees[exam_code[e]], -sizes[exam_code[e]],
+                                                tie_rank[exam_code[e]]))
+        else:
+            remaining_exams = by_size(remaining_exams)
+        for exam in remaining_exams:
+            code = exam_code[exam]
+            blocked = graph.blocked_days(code, exam_offsets_normal)
+            if student_load is None:
+                offset = _first_fit(available_mask & ~blocked, capacity, sizes[code])
+            else:
+                offset = _least_penalty_fit(available_mask & ~blocked, capacity, sizes[code],
+                                            student_load.insertion_costs(code), slots)
+            if offset is not None:
+                if capacity is not None:
+                    capacity.take(offset, int(sizes[code]), code)
+                if student_load is not None:
+                    student_load.add(code, offset // slots)
+                order_normal.append(code)
+                exam_offsets_normal[code] = offset
         # If not placed, exam remains unscheduled.
-    normal_complete = (len(exam_dates_normal) == total_exams)
-    
-    normal_schedule = [(exam_dates_normal[e], e, exam_course[e], len(exam_students[e]))
-                       for e in exam_dates_normal]
-    normal_schedule.sort(key=lambda x: x[0])
+    normal_complete = (len(order_normal) == total_exams)
+    if active():
+        # First-fit takes the lowest free slot, so every available slot before it
+        # was tried; an unplaced exam tried them all.
+        day_offsets = np.array([(d - first_date).days for d in available_days], dtype=np.int64)
+        day_offsets = (day_offsets[:, None] * slots + np.arange(slots)).ravel()
+        tried = np.searchsorted(day_offsets, exam_offsets_normal) + 1
+        tried[exam_offsets_normal < 0] = len(day_offsets)
+        count("days_tried", tried.sum())
+        count("unplaced_exams", total_exams - len(order_normal))
+    clock.lap("normal")
     
     ### OPTION 1: EXTENDED SOLUTION - Extend the date range to schedule all exams conflict-free.
-    exam_dates_extended = exam_dates_normal.copy()
-    student_schedule_extended = {student: set(s) for student, s in student_schedule_normal.items()}
-    extended_last_date = last_date
-    if len(exam_dates_extended) < total_exams:
-        max_extension = 30  # maximum extra days.
-        extension = 0
-        while len(exam_dates_extended) < total_exams and extension < max_extension:
-            extension += 7  # extend by one week.
-            extended_last_date = last_date + timedelta(days=extension)
-            extended_available_days = find_weekdays(first_date, extended_last_date, excluded_dates)
-            unscheduled = [e for e in data['Exam ID'].unique() if e not in exam_dates_extended]
-            for exam in unscheduled:
-                for day in extended_available_days:
-                    if all(day not in student_schedule_extended[student] for student in exam_students[exam]):
-                        exam_dates_extended[exam] = day
-                        for student in exam_students[exam]:
-                            student_schedule_extended[student].add(day)
-                        break
-        extended_schedule = [(exam_dates_extended[e], e, exam_course[e], len(exam_students[e]))
-                             for e in exam_dates_extended]
-        extended_schedule.sort(key=lambda x: x[0])
-    else:
-        extended_schedule = normal_schedule
-        extended_last_date = last_date
+    # Exams the normal pass could not place have no feasible slot up to last_date
+    # (extra placements only add occupancy), so each goes in the earliest feasible
+    # weekday slot after last_date and extended_last_date is the latest day used.
+    exam_offsets_extended = exam_offsets_normal.copy()
+    order_extended = list(order_normal)
+    if len(order_extended) < total_exams:
+        unscheduled = [exam_code[e] for e in by_size(e for e in all_exams if exam_offsets_normal[exam_code[e]] < 0)]
+        extensions = _place_after(graph, unscheduled, exam_offsets_extended, first_date,
+                                  max((last_date - first_date).days + 1, 0) * slots, set(excluded_dates),
+                                  slots, capacity, sizes)
+        count("extension_iterations", extensions)
+        count("extended_exams", len(unscheduled))
+        order_extended += unscheduled
+    extended_schedule = Schedule.from_slots(index, first_date, exam_offsets_extended, slots, order_extended,
+                                            room_names(capacity.assigned) if capacity is not None else None)
     
+    # The load kept by the normal pass scores the extended solution too when
+    # nothing had to go after last_date.
+    if soft_constraints is None:
+        extended_load = None
+    elif normal_complete:
+        extended_load = student_load.framed()
+    else:
+        extended_load = StudentLoad.from_dates(index, extended_schedule, soft_constraints)
     extended_solution = {
-         "exam_dates": exam_dates_extended,
-         "final_schedule": extended_schedule,
-         "extended_last_date": extended_last_date
+         **_solution_fields(index, extended_schedule, extended_load),
+         "extended_last_date": max(last_date, extended_schedule.last_date or last_date),
     }
+    clock.lap("extended")
     
     ### OPTION 2: CONFLICT-MINIMIZED SOLUTION - Force all exams into the given range.
-    exam_dates_conflict = {}
-    student_schedule_conflict = {student: [] for student in data['Student ID'].unique()}
-    for exam, fixed_day in fixed_schedules.items():
-        if fixed_day in available_days:
-            exam_dates_conflict[exam] = fixed_day
-            for student in exam_students.get(exam, []):
-                student_schedule_conflict[student].append(fixed_day)
-    unscheduled = [e for e in data['Exam ID'].unique() if e not in exam_dates_conflict]
-    unscheduled.sort(key=lambda e: len(exam_students[e]), reverse=True)
-    for exam in unscheduled:
-        best_day = None
-        best_conflict = float('inf')
-        for day in available_days:
-            conflict_count = sum(student_schedule_conflict[student].count(day) for student in exam_students[exam])
-            if conflict_count < best_conflict:
-                best_conflict = conflict_count
-                best_day = day
-        exam_dates_conflict[exam] = best_day
-        for student in exam_students[exam]:
-            student_schedule_conflict[student].append(best_day)
-    
-    total_conflicts = 0
-    impacted_students = 0
-    for student, days in student_schedule_conflict.items():
-        counts = {}
-        for d in days:
-            key = d.strftime("%Y-%m-%d")
-            counts[key] = counts.get(key, 0) + 1
-        student_conflicts = sum(count - 1 for count in counts.values() if count > 1)
-        if student_conflicts > 0:
-            impacted_students += 1
-        total_conflicts += student_conflicts
-    
-    conflict_schedule = [(exam_dates_conflict[e], e, exam_course[e], len(exam_students[e]))
-                         for e in exam_dates_conflict]
-    conflict_schedule.sort(key=lambda x: x[0])
+    # Here slots are indices day_index * slots_per_day + session into the available
+    # days. conflict_cost[e, d] counts the students of exam e who already sit an
+    # exam in slot d; placing an exam adds its shared-student counts to the rows
+    # of its conflict-graph neighbours, so picking the best slot is one argmin.
+    num_slots = len(available_days) * slots
+    exam_day_conflict = np.full(index.num_exams, -1)
+    conflict_cost = np.zeros((index.num_exams, num_slots), dtype=np.int64)
+    free_seats = np.full(num_slots, seats, dtype=np.int64) if rooms else None
+    calendar_days = np.repeat([(d - first_date).days for d in available_days], slots).astype(np.int64)
+    if soft_constraints is not None:
+        student_load = StudentLoad(index, np.full(index.num_exams, -1), range_days, soft_constraints)
+    placed_exams = [e for e, d in fixed_schedules.items() if d in available_days and e in exam_code]
+    for exam in placed_exams:
+        code = exam_code[exam]
+        first = available_days.index(fixed_schedules[exam]) * slots
+        day = first + _cheapest_day(conflict_cost[code, first:first + slots],
+                                    None if free_seats is None else free_seats[first:first + slots], sizes[code])
+        if free_seats is not None:
+            free_seats[day] -= sizes[code]
+        if student_load is not None:
+            student_load.add(code, int(calendar_days[day]))
+        exam_day_conflict[code] = day
+        conflict_cost[graph.neighbours(code), day] += graph.neighbour_weights(code)
+    unscheduled = by_size(e for e in all_exams if exam_day_conflict[exam_code[e]] < 0)
+    if available_days:
+        _place_least_conflict(graph, [exam_code[e] for e in unscheduled], exam_day_conflict, conflict_cost,
+                              free_seats, sizes, student_load, calendar_days)
+        placed_exams += unscheduled
+    
+    total_conflicts, impacted_students = _count_conflicts(index, exam_day_conflict)
+    clock.lap("conflict")
+    
+    # Optional improvement phase; fixed exams stay where they were pinned.
+    improved = improve_seconds > 0 and total_conflicts > 0
+    if improved:
+        fixed_codes = [exam_code[e] for e, d in fixed_schedules.items()
+                       if e in exam_code and d in available_days]
+        exam_day_conflict, total_conflicts, impacted_students = tabu_search(
+            index, exam_day_conflict, num_slots, fixed_codes,
+            time_budget=improve_seconds, should_stop=should_stop, seed=seed or 0,
+            slot_seats=np.full(num_slots, seats, dtype=np.int64) if rooms else None)
+        clock.lap("improve")
+    
+    # Available-slot indices back to slots counted from first_date.
+    placed = exam_day_conflict >= 0
+    slot_offsets = np.full(index.num_exams, -1)
+    slot_offsets[placed] = calendar_days[exam_day_conflict[placed]] * slots + exam_day_conflict[placed] % slots
+    rooms_conflict = room_names(_assign_rooms(exam_day_conflict, sizes, rooms)) if rooms else None
+    if rooms:
+        count("unseated_exams", sum(1 for names in rooms_conflict.values() if not names))
+    conflict_schedule = Schedule.from_slots(index, first_date, slot_offsets, slots,
+                                            [exam_code[e] for e in placed_exams], rooms_conflict)
+    count("conflicts", total_conflicts)
+    count("impacted_students", impacted_students)
+    clock.lap("conflict")
     
+    # The tabu search moves exams without updating the load kept while placing.
+    if soft_constraints is None:
+        conflict_load = None
+    elif improved:
+        conflict_load = StudentLoad.from_dates(index, conflict_schedule, soft_constraints)
+    else:
+        conflict_load = student_load.framed()
     conflict_solution = {
-       "exam_dates": exam_dates_conflict,
-       "final_schedule": conflict_schedule,
+       **_solution_fields(index, conflict_schedule, conflict_load),
        "total_conflicts": total_conflicts,
-       "impacted_students": impacted_students
+       "impacted_students": impacted_students,
     }
+    if conflict_load is not None:
+        count("back_to_back", conflict_solution["student_load"]["back_to_back"])
+        count("window_excess", conflict_solution["student_load"]["window_excess"])
+        clock.lap("student_load")
     
     return {
        "normal_complete": normal_complete,
@@ -182,26 +613,226 @@ def schedule_exams_with_options(data, first_date, last_date, excluded_dates, fix
        "conflict_solution": conflict_solution
     }
 
-def compute_conflict_details(data, exam_dates):
+def reschedule_exams(index, previous, first_date, last_date, excluded_dates, fixed_schedules,
+                     added_registrations=(), removed_registrations=(), new_fixed_schedules=None,
+                     new_excluded_dates=(), improve_seconds=0.0, should_stop=None):
     """
-    Given the input data and an exam_dates dictionary (exam -> date),
-    returns a list of tuples (Student ID, Date, Comma-separated exam IDs)
-    for every student that has more than one exam scheduled on the same date.
+    Repairs a previous result of schedule_exams_with_options after a small change
+    instead of scheduling everything again.
+    
+    `index` and `previous` are the EnrollmentIndex and the result dictionary of
+    the previous run, and first_date / last_date / excluded_dates /
+    fixed_schedules its parameters. The change is given as:
+    
+      added_registrations:   [(Student ID, Exam ID, Course Name), ...]
+      removed_registrations: [(Student ID, Exam ID), ...]
+      new_fixed_schedules:   { exam: date, ... } pins to add or move
+      new_excluded_dates:    [date, ...] days that can no longer be used
+    
+    Only the affected exams are re-placed: exams that now clash with a neighbour
+    (because of new registrations or pins), exams on newly excluded days, new
+    exams, and in the conflict-minimized solution the neighbours sharing a day
+    with a changed or pinned exam. Everything else keeps its day.
+    
+    Returns (index, solutions): the updated EnrollmentIndex, to pass to the next
+    call, and a dictionary shaped like the result of schedule_exams_with_options.
+    Repairs work on one session per day without room limits.
     """
-    exam_students = {}
-    for exam in data['Exam ID'].unique():
-        subset = data[data['Exam ID'] == exam]
-        exam_students[exam] = subset['Student ID'].unique().tolist()
+    if added_registrations or removed_registrations:
+        index = update_enrollment_index(index, added_registrations, removed_registrations)
+    new_fixed_schedules = new_fixed_schedules or {}
+    fixed_schedules = {**fixed_schedules, **new_fixed_schedules}
+    excluded_dates = list(excluded_dates) + [d for d in new_excluded_dates if d not in excluded_dates]
+    excluded = set(excluded_dates)
+    available_days = find_weekdays(first_date, last_date, excluded_dates)
+    available_set = set(available_days)
+    graph = index.conflict_graph
+    exam_code = index.exam_code
+    sizes = index.exam_sizes
     
-    student_date_exams = {}
-    for exam, dt in exam_dates.items():
-        date_str = dt.strftime("%Y-%m-%d")
-        for student in exam_students.get(exam, []):
-            student_date_exams.setdefault(student, {}).setdefault(date_str, []).append(exam)
+    changed = {exam_code[e] for _, e, *_ in list(added_registrations) + list(removed_registrations)
+               if e in exam_code}
+    pinned = {exam_code[e]: d for e, d in new_fixed_schedules.items() if e in exam_code and d in available_set}
+    fixed_codes = {exam_code[e] for e, d in fixed_schedules.items() if e in exam_code and d in available_set}
     
-    conflict_list = []
-    for student, date_dict in student_date_exams.items():
-        for date_str, exams in date_dict.items():
-            if len(exams) > 1:
-                conflict_list.append((student, date_str, ", ".join(exams)))
+    def by_size(codes):
+        return sorted(codes, key=lambda c: sizes[c], reverse=True)
+    
+    ### EXTENDED SOLUTION: keep every exam that is still conflict-free.
+    offsets = np.full(index.num_exams, -1)
+    for exam, day in previous["extended_solution"]["exam_dates"].items():
+        code = exam_code.get(exam)
+        if code is not None and code not in pinned and day not in excluded:
+            offsets[code] = (day - first_date).days
+    for code, day in pinned.items():
+        offset = (day - first_date).days
+        neighbours = graph.neighbours(code)
+        clashing = neighbours[offsets[neighbours] == offset]
+        if any(int(c) in fixed_codes for c in clashing):
+            continue
+        offsets[clashing] = -1
+        offsets[code] = offset
+    for code in changed:
+        if offsets[code] >= 0 and (graph.blocked_days(code, offsets) >> int(offsets[code])) & 1:
+            offsets[code] = -1
+    available_mask = _day_mask(available_days, first_date)
+    for code in by_size(np.flatnonzero(offsets < 0).tolist()):
+        offset = _lowest_bit(available_mask & ~graph.blocked_days(code, offsets))
+        if offset is not None:
+            offsets[code] = offset
+    last_offset = (last_date - first_date).days
+    normal_complete = bool((offsets >= 0).all() and (offsets <= last_offset).all())
+    _place_after(graph, by_size(np.flatnonzero(offsets < 0).tolist()), offsets, first_date,
+                 max(last_offset + 1, 0), excluded)
+    extended_schedule = Schedule.from_slots(index, first_date, offsets)
+    extended_solution = {
+         **_solution_fields(index, extended_schedule),
+         "extended_last_date": max(last_date, extended_schedule.last_date or last_date),
+    }
+    
+    ### CONFLICT-MINIMIZED SOLUTION: re-place the changed exams and their clashing neighbours.
+    day_index = {d: i for i, d in enumerate(available_days)}
+    exam_days = np.full(index.num_exams, -1)
+    for exam, day in previous["conflict_solution"]["exam_dates"].items():
+        code = exam_code.get(exam)
+        if code is not None and day in day_index:
+            exam_days[code] = day_index[day]
+    for code, day in pinned.items():
+        exam_days[code] = day_index[day]
+    repair = set(np.flatnonzero(exam_days < 0).tolist()) | changed
+    for code in changed | set(pinned):
+        if exam_days[code] >= 0:
+            neighbours = graph.neighbours(code)
+            repair.update(neighbours[exam_days[neighbours] == exam_days[code]].tolist())
+    repair -= fixed_codes
+    repair = by_size(repair)
+    exam_days[repair] = -1
+    if available_days:
+        conflict_cost = graph.day_costs(exam_days, len(available_days))
+        _place_least_conflict(graph, repair, exam_days, conflict_cost)
+    total_conflicts, impacted_students = _count_conflicts(index, exam_days)
+    if improve_seconds > 0 and total_conflicts > 0:
+        exam_days, total_conflicts, impacted_students = tabu_search(
+            index, exam_days, len(available_days), sorted(fixed_codes),
+            time_budget=improve_seconds, should_stop=should_stop)
+    day_offsets = np.array([(d - first_date).days for d in available_days], dtype=np.int64)
+    placed = exam_days >= 0
+    conflict_offsets = np.full(index.num_exams, -1)
+    conflict_offsets[placed] = day_offsets[exam_days[placed]]
+    conflict_schedule = Schedule.from_slots(index, first_date, conflict_offsets)
+    conflict_solution = {
+       **_solution_fields(index, conflict_schedule),
+       "total_conflicts": total_conflicts,
+       "impacted_students": impacted_students,
+    }
+    
+    return index, {
+       "normal_complete": normal_complete,
+       "extended_solution": extended_solution,
+       "conflict_solution": conflict_solution
+    }
+
+def iter_conflict_details(data, exam_dates, exam_slots=None, slots_per_day=1):
+    """
+    Generator form of compute_conflict_details: yields (Student ID, Date,
+    Comma-separated exam IDs) tuples in the same order, building each row only
+    when it is requested.
+    
+    Registrations are joined to the schedule as integer day codes through the
+    enrollment index and (student, day) duplicates are found by sorting, so no
+    per-student dictionaries are built. `exam_dates` may also be a Schedule,
+    whose day and session arrays are used directly (its own sessions per day
+    replace exam_slots / slots_per_day).
+    """
+    index = as_enrollment_index(data)
+    exam_code = index.exam_code
+    if isinstance(exam_dates, Schedule):
+        schedule = exam_dates
+        exams = [schedule.exams[c] for c in schedule.order.tolist()]
+        days = schedule.slot_numbers()
+        date_strs = schedule.date_strings(with_sessions=True)
+        if schedule.exams is not index.exams:
+            known = np.fromiter((e in exam_code for e in exams), dtype=bool, count=len(exams))
+            exams = [e for e, k in zip(exams, known.tolist()) if k]
+            days = days[known]
+            date_strs = [d for d, k in zip(date_strs, known.tolist()) if k]
+        if not exams:
+            return
+        codes = np.fromiter((exam_code[e] for e in exams), dtype=np.int64, count=len(exams))
+    else:
+        exams = [exam for exam in exam_dates if exam in exam_code]
+        if not exams:
+            return
+        codes = np.fromiter((exam_code[e] for e in exams), dtype=np.int64, count=len(exams))
+        days = np.fromiter((exam_dates[e].toordinal() for e in exams), dtype=np.int64, count=len(exams))
+        if exam_slots:
+            days = days * slots_per_day + np.fromiter((exam_slots.get(e, 0) for e in exams), dtype=np.int64,
+                                                      count=len(exams))
+        date_strs = [exam_dates[e].strftime("%Y-%m-%d") for e in exams]
+        if exam_slots and slots_per_day > 1:
+            date_strs = [f"{d} {slot_label(exam_slots.get(e, 0), slots_per_day)}"
+                         for d, e in zip(date_strs, exams)]
+    
+    # One entry per (exam, student) registration, numbered in the order the
+    # exams appear in exam_dates (`seq`), which defines the output order.
+    starts = index.exam_ptr[codes]
+    lengths = index.exam_ptr[codes + 1] - starts
+    total = int(lengths.sum())
+    seq = np.arange(total)
+    pair_exam = np.repeat(np.arange(len(exams)), lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    pair_student = index.exam_student_codes[seq - offsets[pair_exam] + starts[pair_exam]]
+    pair_day = days[pair_exam]
+    
+    # Group by (student, day); within a group the registrations stay in seq order.
+    order = np.lexsort((seq, pair_day, pair_student))
+    sorted_student = pair_student[order]
+    sorted_day = pair_day[order]
+    new_group = np.empty(total, dtype=bool)
+    new_group[0] = True
+    new_group[1:] = (sorted_student[1:] != sorted_student[:-1]) | (sorted_day[1:] != sorted_day[:-1])
+    group_starts = np.flatnonzero(new_group)
+    group_sizes = np.diff(np.append(group_starts, total))
+    
+    # Students are reported in order of first appearance, then their dates.
+    student_starts = np.flatnonzero(np.append(True, sorted_student[1:] != sorted_student[:-1]))
+    student_first = np.minimum.reduceat(order, student_starts)
+    first_of_student = student_first[np.searchsorted(student_starts, group_starts, side="right") - 1]
+    
+    conflicts = group_sizes > 1
+    group_starts, group_sizes = group_starts[conflicts], group_sizes[conflicts]
+    emit = np.lexsort((order[group_starts], first_of_student[conflicts]))
+    
+    students = index.students
+    sorted_exam = pair_exam[order]
+    for g in emit.tolist():
+        rows = sorted_exam[group_starts[g]:group_starts[g] + group_sizes[g]].tolist()
+        yield (students[int(sorted_student[group_starts[g]])], date_strs[rows[0]],
+               ", ".join(str(exams[r]) for r in rows))
+
+def compute_conflict_details(data, exam_dates, exam_slots=None, slots_per_day=1):
+    """
+    Given the input data (DataFrame or EnrollmentIndex) and an exam_dates
+    dictionary (exam -> date) or Schedule, returns a list of tuples (Student ID, Date,
+    Comma-separated exam IDs) for every student that has more than one exam
+    scheduled on the same date. With several sessions a day, `exam_slots`
+    (exam -> session) makes it the same session instead, and Date includes
+    the session (e.g. "2025-05-12 AM").
+    """
+    with stage("details"):
+        conflict_list = list(iter_conflict_details(data, exam_dates, exam_slots, slots_per_day))
+    count("conflict_rows", len(conflict_list))
     return conflict_list
+
+def compute_student_load_details(data, exam_dates, soft_constraints=None):
+    """
+    Given the input data (DataFrame or EnrollmentIndex) and an exam_dates
+    dictionary (exam -> date) or Schedule, returns the soft-constraint penalty of every
+    student who has one, highest first: a list of tuples (Student ID,
+    back-to-back day pairs, exams over the window limit, penalty). See
+    student_load.SOFT_CONSTRAINTS for the settings.
+    """
+    with stage("load_details"):
+        details = StudentLoad.from_dates(as_enrollment_index(data), exam_dates, soft_constraints).details()
+    count("load_rows", len(details))
+    return details
@@ -0,0 +1,205 @@
+# scheduler/solution_store.py
+
+import io
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from .schedule import Schedule
+
+# Row tables of a stored solution; every other entry is an integer statistic.
+_TABLES = ("extended_solution", "conflict_solution", "conflict_details", "load_details")
+
+# Schedules of a stored solution, kept as their arrays (see Schedule.to_arrays).
+_SCHEDULES = ("extended_schedule", "conflict_schedule")
+
+
+def _encode_column(values):
+    """
+    Returns (codes, uniques) for a column of row values: integer columns are
+    stored as-is (uniques is None), anything else is coded against its sorted
+    unique strings.
+    """
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values):
+        return np.asarray(values, dtype=np.int64), None
+    uniques, codes = np.unique(np.asarray([str(v) for v in values]), return_inverse=True)
+    dtype = np.int16 if len(uniques) <= np.iinfo(np.int16).max else np.int32
+    return codes.astype(dtype), uniques
+
+
+def pack_solution(record):
+    """
+    Serialises a solution record into a compressed, integer-coded columnar
+    blob. `record` holds the row tables in _TABLES (lists of tuples such as
+    (date_str, exam, course, count) or (student, date_str, exams)), the
+    Schedules in _SCHEDULES and integer statistics such as "total_conflicts".
+    """
+    arrays = {}
+    for name, value in record.items():
+        if name in _SCHEDULES:
+            arrays.update((f"{name}.{key}", column) for key, column in value.to_arrays().items())
+            continue
+        if name not in _TABLES:
+            arrays[name] = np.asarray(value, dtype=np.int64)
+            continue
+        arrays[f"{name}.rows"] = np.asarray(len(value), dtype=np.int64)
+        for i, column in enumerate(zip(*value)):
+            codes, uniques = _encode_column(column)
+            arrays[f"{name}.{i}"] = codes
+            if uniques is not None:
+                arrays[f"{name}.{i}.values"] = uniques
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def iter_solution_rows(blob, name, chunk_size=10000):
+    """
+    Yields the rows of table `name` of a packed solution as lists of at most
+    `chunk_size` tuples. Only the integer codes are loaded in full; strings are
+    looked up one chunk at a time, so memory does not grow with the table.
+    """
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        num_rows, columns = _table_columns(arrays, name)
+    for start in range(0, num_rows, chunk_size):
+        yield _decode_rows(columns, start, start + chunk_size)
+
+
+def _table_columns(arrays, name):
+    """(number of rows, [(codes, uniques or None), ...]) of table `name`, (0, []) if absent."""
+    if f"{name}.rows" not in arrays:
+        return 0, []
+    columns = []
+    i = 0
+    while f"{name}.{i}" in arrays:
+        values = arrays[f"{name}.{i}.values"] if f"{name}.{i}.values" in arrays else None
+        columns.append((arrays[f"{name}.{i}"], values))
+        i += 1
+    return int(arrays[f"{name}.rows"]), columns
+
+
+def _decode_rows(columns, start, stop):
+    chunk = []
+    for codes, values in columns:
+        codes = codes[start:stop]
+        chunk.append((codes if values is None else values[codes]).tolist())
+    return list(zip(*chunk))
+
+
+def count_solution_rows(blob, name):
+    """Number of rows of table `name` of a packed solution (0 if it has none)."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        return int(arrays[f"{name}.rows"]) if f"{name}.rows" in arrays else 0
+
+
+def solution_rows(blob, name, start, stop):
+    """
+    Rows start:stop of table `name` of a packed solution, e.g. one page of
+    conflict details; strings are only looked up for those rows.
+    """
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        _, columns = _table_columns(arrays, name)
+    return _decode_rows(columns, start, stop)
+
+
+def _unpack_schedule(arrays, name):
+    prefix = f"{name}."
+    return Schedule.from_arrays({key[len(prefix):]: arrays[key] for key in arrays.files if key.startswith(prefix)})
+
+
+def load_schedule(blob, name):
+    """
+    Returns Schedule `name` ("extended_schedule" or "conflict_schedule") of a
+    packed solution, or None; the row tables are not decoded.
+    """
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        if f"{name}.days" not in arrays:
+            return None
+        return _unpack_schedule(arrays, name)
+
+
+def unpack_solution(blob, tables=_TABLES):
+    """
+    Inverse of pack_solution: returns the record with plain Python values (and
+    Schedules). Only the row tables named in `tables` are decoded.
+    """
+    record = {}
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        for name in _SCHEDULES:
+            if f"{name}.days" in arrays:
+                record[name] = _unpack_schedule(arrays, name)
+        for name in tables:
+            if f"{name}.rows" in arrays:
+                num_rows, columns = _table_columns(arrays, name)
+                record[name] = _decode_rows(columns, 0, num_rows)
+        for name in arrays.files:
+            if "." not in name:
+                record[name] = int(arrays[name])
+    return record
+
+
+class SolutionStore:
+    """
+    SQLite table of packed solutions (see pack_solution) keyed by an id, so
+    that a session only needs to carry the id. Entries not read or written for
+    longer than the purge age are deleted by purge().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                " id TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed on exit."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, solution_id, record):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO solutions (id, data, updated) VALUES (?, ?, ?)",
+                (solution_id, pack_solution(record), time.time()),
+            )
+
+    def load_packed(self, solution_id):
+        """
+        Returns the packed blob of a solution (see iter_solution_rows), or None
+        if it does not exist (or expired).
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM solutions WHERE id = ?", (solution_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE solutions SET updated = ? WHERE id = ?", (time.time(), solution_id))
+        return row[0]
+
+    def load(self, solution_id, tables=_TABLES):
+        """
+        Returns the stored record with the row tables in `tables`, or None if
+        it does not exist (or expired).
+        """
+        blob = self.load_packed(solution_id)
+        return None if blob is None else unpack_solution(blob, tables)
+
+    def purge(self, max_age):
+        """Deletes solutions that have not been used for `max_age` seconds."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM solutions WHERE updated < ?", (time.time() - max_age,))
@@ -0,0 +1,198 @@
+# scheduler/student_load.py
+
+import numpy as np
+
+from .schedule import Schedule
+
+# Soft constraints on a student's exam load:
+#   back_to_back_weight  penalty per pair of consecutive calendar days on which
+#                        a student has exams (three days in a row = 2 pairs).
+#   max_exams,           every window of window_days consecutive days may hold
+#   window_days          max_exams of a student's exams; each exam beyond that,
+#                        in every window, costs window_weight.
+SOFT_CONSTRAINTS = {
+    "back_to_back_weight": 1,
+    "max_exams": 2,
+    "window_days": 3,
+    "window_weight": 1,
+}
+
+
+class StudentLoad:
+    """
+    Exams per student and calendar day, with the counters needed to score the
+    soft constraints (see SOFT_CONSTRAINTS) incrementally as exams are placed,
+    removed or moved. Days are offsets 0 .. num_days - 1; exams on day -1 are
+    unscheduled.
+
+      load[s, d]          number of exams student s sits on day d.
+      window[s, w]        sliding-window counter: exams of student s on days
+                          w .. w + window_days - 1 (one window if num_days is
+                          shorter than a window).
+      back_to_back[s]     pairs of consecutive days on which s has exams.
+      window_excess[s]    sum over windows of max(window[s, w] - max_exams, 0).
+
+    Placing or removing an exam only touches the days next to it and the
+    windows that cover it, for the exam's students only.
+    """
+
+    def __init__(self, index, exam_days, num_days, settings=None, load=None):
+        self.index = index
+        self.settings = {**SOFT_CONSTRAINTS, **(settings or {})}
+        self.num_days = num_days
+        self.span = self.settings["window_days"]
+        self.num_windows = max(num_days - self.span + 1, 1)
+        self.exam_days = np.asarray(exam_days).copy()
+
+        if load is not None:
+            self.load = load.astype(np.int16)
+        else:
+            self.load = np.zeros((index.num_students, num_days), dtype=np.int16)
+            if (self.exam_days >= 0).any():
+                # Counted over the flat student * num_days + day index.
+                reg_days = self.exam_days[np.repeat(np.arange(index.num_exams), index.exam_sizes)]
+                placed = reg_days >= 0
+                flat = index.exam_student_codes[placed].astype(np.int64) * num_days + reg_days[placed]
+                self.load[:] = np.bincount(flat, minlength=index.num_students * num_days).reshape(
+                    index.num_students, num_days)
+
+        cumulative = np.zeros((index.num_students, num_days + 1), dtype=np.int32)
+        np.cumsum(self.load, axis=1, out=cumulative[:, 1:])
+        starts = np.arange(self.num_windows)
+        self.window = (cumulative[:, np.minimum(starts + self.span, num_days)]
+                       - cumulative[:, starts]).astype(np.int16)
+
+        occupied = self.load > 0
+        self.back_to_back = (occupied[:, :-1] & occupied[:, 1:]).sum(axis=1).astype(np.int64)
+        self.window_excess = np.maximum(self.window.astype(np.int64) - self.settings["max_exams"], 0).sum(axis=1)
+
+    @classmethod
+    def from_dates(cls, index, exam_dates, settings=None):
+        """
+        Builds the load of an {exam: date} schedule or a Schedule, with day 0
+        on its earliest date. A Schedule of another index is mapped through
+        exam IDs, and exams the index does not know are left out.
+        """
+        if isinstance(exam_dates, Schedule):
+            schedule = exam_dates
+            if schedule.exams is index.exams:
+                days = schedule.days.astype(np.int64)
+            else:
+                exam_code = index.exam_code
+                days = np.full(index.num_exams, -1, dtype=np.int64)
+                order = schedule.order
+                for exam_day, code in zip(schedule.days[order].tolist(), order.tolist()):
+                    target = exam_code.get(schedule.exams[code])
+                    if target is not None:
+                        days[target] = exam_day
+            placed = days >= 0
+            if not placed.any():
+                return cls(index, days, 1, settings)
+            days[placed] -= days[placed].min()
+            return cls(index, days, int(days.max()) + 1, settings)
+        exam_days = np.full(index.num_exams, -1)
+        if not exam_dates:
+            return cls(index, exam_days, 1, settings)
+        origin = min(exam_dates.values())
+        exam_code = index.exam_code
+        for exam, day in exam_dates.items():
+            exam_days[exam_code[exam]] = (day - origin).days
+        return cls(index, exam_days, int(exam_days.max()) + 1, settings)
+
+    def framed(self):
+        """
+        The same placements as from_dates would frame them: day 0 on the
+        earliest scheduled day and the latest one last. Built from the load
+        counters, so a load maintained while placing exams can be scored
+        without going back to the registrations.
+        """
+        placed = self.exam_days >= 0
+        if not placed.any():
+            return StudentLoad(self.index, self.exam_days, 1, self.settings)
+        first, last = int(self.exam_days[placed].min()), int(self.exam_days[placed].max())
+        return StudentLoad(self.index, np.where(placed, self.exam_days - first, -1), last - first + 1,
+                           self.settings, self.load[:, first:last + 1])
+
+    @property
+    def penalties(self):
+        """Weighted soft-constraint penalty per student code."""
+        return (self.settings["back_to_back_weight"] * self.back_to_back
+                + self.settings["window_weight"] * self.window_excess)
+
+    def summary(self):
+        """Totals: {"back_to_back", "window_excess", "penalty", "penalized_students"}."""
+        penalties = self.penalties
+        return {
+            "back_to_back": int(self.back_to_back.sum()),
+            "window_excess": int(self.window_excess.sum()),
+            "penalty": int(penalties.sum()),
+            "penalized_students": int(np.count_nonzero(penalties)),
+        }
+
+    def _windows_covering(self, day):
+        return max(day - self.span + 1, 0), min(day, self.num_windows - 1) + 1
+
+    def _local(self, students, day):
+        """(back-to-back pairs around `day`, excess in the windows covering it) per student."""
+        occupied = self.load[students, max(day - 1, 0):day + 2] > 0
+        pairs = (occupied[:, :-1] & occupied[:, 1:]).sum(axis=1)
+        lo, hi = self._windows_covering(day)
+        excess = np.maximum(self.window[students, lo:hi].astype(np.int64) - self.settings["max_exams"], 0)
+        return pairs, excess.sum(axis=1)
+
+    def _shift(self, exam_code, day, step):
+        students = self.index.students_of(exam_code)
+        pairs_before, excess_before = self._local(students, day)
+        self.load[students, day] += step
+        lo, hi = self._windows_covering(day)
+        self.window[students, lo:hi] += step
+        pairs_after, excess_after = self._local(students, day)
+        self.back_to_back[students] += pairs_after - pairs_before
+        self.window_excess[students] += excess_after - excess_before
+
+    def add(self, exam_code, day):
+        """Places an unscheduled exam on `day`, updating every counter."""
+        self._shift(exam_code, day, 1)
+        self.exam_days[exam_code] = day
+
+    def remove(self, exam_code):
+        """Unschedules a placed exam, updating every counter."""
+        self._shift(exam_code, int(self.exam_days[exam_code]), -1)
+        self.exam_days[exam_code] = -1
+
+    def move(self, exam_code, day):
+        """Moves a placed exam to another day, updating every counter."""
+        self.remove(exam_code)
+        self.add(exam_code, day)
+
+    def insertion_costs(self, exam_code):
+        """
+        Returns, for every day, how much the total penalty would grow if the
+        (unscheduled) exam were placed on that day.
+        """
+        students = self.index.students_of(exam_code)
+        occupied = self.load[students] > 0
+        # A new exam day adds a pair with each occupied neighbouring day.
+        neighbours = np.zeros(occupied.shape, dtype=np.int64)
+        neighbours[:, 1:] += occupied[:, :-1]
+        neighbours[:, :-1] += occupied[:, 1:]
+        back_to_back = (neighbours * ~occupied).sum(axis=0)
+        # Every covering window that is already full gains one excess exam.
+        full = np.concatenate(([0], np.cumsum((self.window[students] >= self.settings["max_exams"]).sum(axis=0))))
+        days = np.arange(self.num_days)
+        lo = np.maximum(days - self.span + 1, 0)
+        hi = np.minimum(days, self.num_windows - 1) + 1
+        window = full[hi] - full[lo]
+        return self.settings["back_to_back_weight"] * back_to_back + self.settings["window_weight"] * window
+
+    def details(self):
+        """
+        Per-student breakdown for every student with a penalty, highest first:
+        [(Student ID, back-to-back pairs, window excess, penalty), ...].
+        """
+        penalties = self.penalties
+        codes = np.flatnonzero(penalties)
+        codes = codes[np.lexsort((codes, -penalties[codes]))]
+        students = self.index.students
+        return [(students[int(s)], int(self.back_to_back[s]), int(self.window_excess[s]), int(penalties[s]))
+                for s in codes.tolist()]
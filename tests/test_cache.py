@@ -0,0 +1,20 @@
+# tests/test_cache.py
+import pickle
+
+from scheduler.cache import LRUCache
+
+
+def test_unreadable_disk_entries_are_dropped_as_misses(tmp_path):
+    cache = LRUCache(max_entries=1, directory=str(tmp_path))
+    cache.set("good", {"value": 1})
+    truncated = pickle.dumps(list(range(1000)))[:-20]
+    # Written by versions whose class or module no longer exists.
+    renamed = pickle.dumps(LRUCache).replace(b"LRUCache", b"OldCache")
+    moved = pickle.dumps(LRUCache).replace(b"scheduler.cache", b"scheduler.gone_")
+    for key, data in (("truncated", truncated), ("renamed", renamed), ("moved", moved),
+                      ("garbage", b"\x80\x05not a pickle")):
+        (tmp_path / f"{key}.pkl").write_bytes(data)
+        assert cache.get(key, "miss") == "miss"
+        assert not (tmp_path / f"{key}.pkl").exists()
+    cache._entries.clear()
+    assert cache.get("good") == {"value": 1}
@@ -0,0 +1,96 @@
+# tests/test_incremental.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from scheduler.conflict_graph import build_conflict_graph
+from scheduler.enrollment import EnrollmentIndex, build_enrollment_index, update_enrollment_index
+from scheduler.scheduler import compute_conflict_details, reschedule_exams, schedule_exams_with_options
+
+FIRST_DATE, LAST_DATE = datetime(2025, 5, 12), datetime(2025, 5, 23)
+
+
+def _registrations(rng, num_students=150, num_exams=25, max_exams=5):
+    return {(f"S{s}", f"EX{e}")
+            for s in range(num_students)
+            for e in rng.choice(num_exams, size=rng.integers(1, max_exams + 1), replace=False).tolist()}
+
+
+def _frame(registrations):
+    rows = sorted((student, exam, f"Course {exam}") for student, exam in registrations)
+    return pd.DataFrame(rows, columns=["Student ID", "Exam ID", "Course Name"]).astype("category")
+
+
+def _change(rng, registrations, num_changes, num_exams=25):
+    """Random (added, removed, new registration set), with some new students and exams."""
+    current = sorted(registrations)
+    removed = [current[i] for i in rng.choice(len(current), size=num_changes, replace=False).tolist()]
+    added = set()
+    while len(added) < num_changes:
+        student = f"S{rng.integers(170)}"  # S150.. are new students
+        exam = f"EX{rng.integers(num_exams + 2)}"  # the last two are new exams
+        if (student, exam) not in registrations:
+            added.add((student, exam))
+    return ([(s, e, f"Course {e}") for s, e in sorted(added)], removed,
+            (registrations - set(removed)) | added)
+
+
+def _students_by_exam(index):
+    return {exam: sorted(index.students[s] for s in index.students_of(code).tolist())
+            for code, exam in enumerate(index.exams) if len(index.students_of(code))}
+
+
+def _edges(index, graph):
+    return {(index.exams[a], index.exams[int(b)]): int(w)
+            for a in range(graph.num_exams)
+            for b, w in zip(graph.neighbours(a).tolist(), graph.neighbour_weights(a).tolist())}
+
+
+def test_patched_index_and_graph_equal_a_rebuild():
+    rng = np.random.default_rng(0)
+    for trial in range(20):
+        registrations = _registrations(rng)
+        index = build_enrollment_index(_frame(registrations))
+        index.conflict_graph
+        added, removed, changed = _change(rng, registrations, num_changes=int(rng.integers(1, 15)))
+
+        patched = update_enrollment_index(index, added, removed)
+        rebuilt = build_enrollment_index(_frame(changed))
+        assert _students_by_exam(patched) == _students_by_exam(rebuilt)
+        assert patched.exam_course == {**index.exam_course, **{e: c for _, e, c in added}}
+
+        # Same codes: the patched student CSR and graph must equal ones built from scratch.
+        fresh = EnrollmentIndex(patched.exams, patched.students, patched.courses,
+                                patched.exam_ptr, patched.exam_student_codes)
+        for patched_array, fresh_array in zip(patched.student_csr, fresh.student_csr):
+            np.testing.assert_array_equal(patched_array, fresh_array)
+        graph, full = patched.conflict_graph, build_conflict_graph(fresh)
+        np.testing.assert_array_equal(graph.indptr, full.indptr)
+        np.testing.assert_array_equal(graph.indices, full.indices)
+        np.testing.assert_array_equal(graph.weights, full.weights)
+        assert _edges(patched, graph) == _edges(rebuilt, rebuilt.conflict_graph)
+
+
+def test_reschedule_keeps_unaffected_exams_on_their_dates():
+    rng = np.random.default_rng(1)
+    for trial in range(10):
+        # Sparse enough that most exams are not next to a changed one.
+        registrations = _registrations(rng, num_exams=80, max_exams=3)
+        index = build_enrollment_index(_frame(registrations))
+        previous = schedule_exams_with_options(index, FIRST_DATE, LAST_DATE, [], {})
+        added, removed, _ = _change(rng, registrations, num_changes=2, num_exams=80)
+
+        updated, solutions = reschedule_exams(index, previous, FIRST_DATE, LAST_DATE, [], {},
+                                              added_registrations=added, removed_registrations=removed)
+        code = updated.exam_code
+        changed = {code[e] for _, e, *_ in added + removed}
+        graph = updated.conflict_graph
+        affected = changed.union(*(graph.neighbours(c).tolist() for c in changed))
+        unaffected = [e for e in index.exams if code[e] not in affected]
+        assert len(unaffected) > index.num_exams // 2
+        for which in ("extended_solution", "conflict_solution"):
+            before, after = previous[which]["exam_dates"], solutions[which]["exam_dates"]
+            assert len(after) == updated.num_exams
+            assert {e: after[e] for e in unaffected} == {e: before[e] for e in unaffected}
+        assert compute_conflict_details(updated, solutions["extended_solution"]["schedule"]) == []
@@ -0,0 +1,51 @@
+# tests/test_jobs.py
+import os
+import signal
+import time
+
+from scheduler.jobs import JobQueue, JobStore
+
+
+def _answer(store, job_id, value):
+    store.set_stage(job_id, "solve")
+    return value
+
+
+def _crash(store, job_id):
+    store.set_stage(job_id, "solve")
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def _wait(store, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while store.status(job_id)["status"] not in ("done", "failed"):
+        assert time.monotonic() < deadline, store.status(job_id)
+        time.sleep(0.05)
+    return store.status(job_id)
+
+
+def test_killed_worker_fails_its_job_and_the_queue_recovers(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = JobQueue(store, max_workers=1)
+    try:
+        crashed = queue.submit(_crash)
+        assert _wait(store, crashed)["status"] == "failed"
+        job_id = queue.submit(_answer, 42)
+        assert _wait(store, job_id)["status"] == "done"
+        assert store.result(job_id) == 42
+    finally:
+        queue.shutdown()
+
+
+def test_unfinished_jobs_fail_when_the_owner_reopens_the_store(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    queued, running, done = store.create(), store.create(), store.create()
+    store.set_stage(running, "solve")
+    store.finish(done, "result")
+    assert JobStore(path).status(running)["status"] == "running"
+
+    reopened = JobStore(path, fail_unfinished=True)
+    assert reopened.status(queued)["status"] == "failed"
+    assert reopened.status(running)["status"] == "failed"
+    assert reopened.status(done)["status"] == "done"
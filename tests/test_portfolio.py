@@ -0,0 +1,38 @@
+# tests/test_portfolio.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from scheduler.enrollment import build_enrollment_index
+from scheduler.portfolio import portfolio_runs, schedule_exams_portfolio
+from scheduler.scheduler import compute_conflict_details, find_weekdays, schedule_exams_with_options
+
+FIRST_DATE, LAST_DATE = datetime(2025, 5, 12), datetime(2025, 5, 16)
+
+
+def _registrations(seed=0, num_students=120, num_exams=18):
+    rng = np.random.default_rng(seed)
+    rows = [(f"S{s}", f"EX{e}", f"Course {e}")
+            for s in range(num_students)
+            for e in rng.choice(num_exams, size=rng.integers(2, 6), replace=False).tolist()]
+    return pd.DataFrame(rows, columns=["Student ID", "Exam ID", "Course Name"]).astype("category")
+
+
+def test_best_of_portfolio_is_feasible_and_no_worse_than_each_start():
+    index = build_enrollment_index(_registrations())
+    days = find_weekdays(FIRST_DATE, LAST_DATE)
+    for options in ({}, {"soft_constraints": {}}, {"slots_per_day": 2, "rooms": {"Hall": 80, "Room": 40}}):
+        best = schedule_exams_portfolio(index, FIRST_DATE, LAST_DATE, [], {}, num_runs=5, workers=2, **options)
+        extended, forced = best["extended_solution"], best["conflict_solution"]
+        assert len(extended["schedule"]) == len(forced["schedule"]) == index.num_exams
+        assert extended["schedule"].exams is index.exams and forced["schedule"].exams is index.exams
+        assert compute_conflict_details(index, extended["schedule"]) == []
+        assert set(forced["exam_dates"].values()) <= set(days)
+        assert (forced["student_load"] is None) == ("soft_constraints" not in options)
+
+        for strategy, seed in portfolio_runs(5):
+            single = schedule_exams_with_options(index, FIRST_DATE, LAST_DATE, [], {}, strategy=strategy,
+                                                 seed=seed, **options)
+            assert extended["extended_last_date"] <= single["extended_solution"]["extended_last_date"]
+            assert forced["total_conflicts"] <= single["conflict_solution"]["total_conflicts"]
@@ -0,0 +1,35 @@
+# tests/test_schedule.py
+from datetime import datetime
+
+import pandas as pd
+
+from scheduler.enrollment import build_enrollment_index
+from scheduler.schedule import Schedule
+from scheduler.scheduler import iter_conflict_details, schedule_exams_with_options
+
+
+def _index(exam_ids):
+    return build_enrollment_index(pd.DataFrame({
+        "Student ID": ["S1", "S1", "S2", "S2"],
+        "Exam ID": exam_ids,
+        "Course Name": ["C1", "C2", "C1", "C3"],
+    }).astype("category"))
+
+
+def test_round_trip_keeps_exam_ids_and_their_type():
+    for exam_ids in ([10, 20, 10, 30], ["E1", "E2", "E1", "E3"], [10, "E2", 10, "E3"]):
+        index = _index(exam_ids)
+        schedule = Schedule.from_dates(index, {exam: datetime(2025, 5, 12 + i)
+                                               for i, exam in enumerate(index.exams)})
+        restored = Schedule.from_bytes(schedule.to_bytes())
+        assert dict(restored.exam_dates) == dict(schedule.exam_dates)
+        assert [type(exam) for exam in restored.exam_dates] == [type(exam) for exam in schedule.exam_dates]
+
+
+def test_restored_numeric_schedule_matches_the_index():
+    index = _index([10, 20, 10, 30])
+    schedule = schedule_exams_with_options(index, datetime(2025, 5, 12), datetime(2025, 5, 12), [], {})[
+        "conflict_solution"]["schedule"]
+    restored = Schedule.from_bytes(schedule.to_bytes())
+    assert list(iter_conflict_details(index, restored)) == list(iter_conflict_details(index, schedule))
+    assert list(iter_conflict_details(index, restored))
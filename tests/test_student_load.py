@@ -0,0 +1,55 @@
+# tests/test_student_load.py
+from datetime import datetime
+
+import pandas as pd
+
+from scheduler.enrollment import build_enrollment_index
+from scheduler.scheduler import (
+    compute_student_load_details,
+    compute_student_load_summary,
+    schedule_exams_with_options,
+)
+
+REGISTRATIONS = pd.DataFrame({
+    "Student ID": ["S1", "S1", "S1", "S2", "S2", "S3", "S3"],
+    "Exam ID": ["E1", "E2", "E3", "E2", "E3", "E1", "E4"],
+    "Course Name": ["C1", "C2", "C3", "C2", "C3", "C1", "C4"],
+}).astype("category")
+
+
+def _solutions(**options):
+    return schedule_exams_with_options(REGISTRATIONS, datetime(2025, 5, 12), datetime(2025, 5, 16), [], {},
+                                       **options)
+
+
+def test_details_of_a_dataframe_and_a_schedule_match_the_dict_form():
+    for options in ({}, {"slots_per_day": 2}, {"soft_constraints": {"max_exams": 1}}):
+        schedule = _solutions(**options)["extended_solution"]["schedule"]
+        expected = compute_student_load_details(REGISTRATIONS, dict(schedule.exam_dates))
+        assert compute_student_load_details(REGISTRATIONS, schedule) == expected
+        assert compute_student_load_details(build_enrollment_index(REGISTRATIONS), schedule) == expected
+
+
+def test_exams_unknown_to_the_index_are_ignored():
+    schedule = _solutions()["extended_solution"]["schedule"]
+    other = build_enrollment_index(REGISTRATIONS[REGISTRATIONS["Exam ID"] != "E4"]
+                                   .astype(str).astype("category"))
+    expected = compute_student_load_details(other, {exam: date for exam, date in schedule.exam_dates.items()
+                                                    if exam != "E4"})
+    assert compute_student_load_details(other, schedule) == expected
+
+
+def test_solution_load_matches_a_rebuild_from_its_schedule():
+    for options in ({"soft_constraints": {}}, {"soft_constraints": {}, "slots_per_day": 2},
+                    {"soft_constraints": {"max_exams": 1}, "improve_seconds": 0.05, "seed": 1}):
+        solutions = _solutions(**options)
+        for which in ("extended_solution", "conflict_solution"):
+            solution = solutions[which]
+            assert solution["student_load"] == compute_student_load_summary(
+                REGISTRATIONS, solution["schedule"], options["soft_constraints"])
+
+
+def test_solutions_without_soft_constraints_are_not_scored():
+    solutions = _solutions()
+    assert solutions["extended_solution"]["student_load"] is None
+    assert solutions["conflict_solution"]["student_load"] is None
@@ -1,19 +1,23 @@
 # web/app.py
 
+import hashlib
 import os
 import io
-import base64
 import calendar
 from datetime import datetime
-import json
+import re
+import tempfile
+import time
+import uuid
+import csv
+from contextlib import ExitStack
+from itertools import chain
 
-# Use non-interactive backend to avoid Tkinter issues.
-import matplotlib
-matplotlib.use('Agg')
-
-import pandas as pd
-import matplotlib.pyplot as plt
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+# pandas, matplotlib and openpyxl are imported where they are used (reading an
+# upload, drawing a PNG calendar, writing an Excel export), so starting the
+# app or a worker does not pay for them. Calendars are drawn on Agg canvases
+# without pyplot, so no backend has to be selected.
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, jsonify, abort, Response, g
 from flask_session import Session
 
 
@@ -21,9 +25,27 @@ from flask_session import Session
 from scheduler.scheduler import (
     read_and_analyze_data,
     schedule_exams_with_options,
-    compute_conflict_details
+    compute_conflict_details,
+    compute_student_load_details,
+    compute_student_load_summary,
+    STRATEGIES
+)
+from scheduler.enrollment import build_enrollment_index
+from scheduler.exact import schedule_exams_exact
+from scheduler.portfolio import schedule_exams_portfolio
+from scheduler.cache import LRUCache, file_digest, solution_key
+from scheduler.jobs import JobQueue, JobStore
+from scheduler.metrics import MetricsLog, Recorder, count, profiled, recording, stage, summarize
+from scheduler.solution_store import (
+    SolutionStore,
+    count_solution_rows,
+    iter_solution_rows,
+    load_schedule,
+    solution_rows,
+    unpack_solution,
 )
-from scheduler.calendar_utils import generate_calendar_images
+from scheduler.student_load import SOFT_CONSTRAINTS
+from scheduler.calendar_utils import calendar_months, render_calendar_png, render_calendar_svg
 
 app = Flask(__name__)
 app.config["UPLOAD_FOLDER"] = "uploads"
@@ -35,6 +57,103 @@ app.config["SESSION_FILE_DIR"] = os.path.join(app.root_path, "flask_session")
 app.config["SESSION_PERMANENT"] = False
 Session(app)
 
+# Seconds of tabu search spent improving the forced (conflict-minimized) schedule.
+app.config["IMPROVE_SECONDS"] = 2.0
+
+# Seconds the exact solver (OR-Tools CP-SAT, optional) may spend on each of
+# its objectives (minimal span, minimal conflicts) when "exact" is selected.
+app.config["EXACT_TIME_LIMIT"] = 10.0
+
+# Runs of the portfolio solver (every strategy, then seeded variants; see
+# scheduler/portfolio.py), spread over one process per CPU. None runs one per CPU.
+app.config["PORTFOLIO_RUNS"] = None
+
+# Student load weights (see scheduler/student_load.py): used to steer the
+# greedy placement when "Spread each student's exams" is ticked, and to score
+# every schedule.
+app.config["SOFT_CONSTRAINTS"] = dict(SOFT_CONSTRAINTS)
+
+# Content-addressed caches: parsed uploads keyed by the file's SHA-256, and
+# finished solutions keyed by (file hash, scheduling parameters).
+app.config["CACHE_DIR"] = os.path.join(app.root_path, "cache")
+index_cache = LRUCache(max_entries=8, directory=os.path.join(app.config["CACHE_DIR"], "indexes"),
+                       max_disk_entries=64)
+solution_cache = LRUCache(max_entries=64, directory=os.path.join(app.config["CACHE_DIR"], "solutions"),
+                          max_disk_entries=512)
+
+# Scheduling runs in background worker processes; jobs and their results are
+# tracked in SQLite and dropped after JOB_MAX_AGE seconds.
+app.config["JOB_DB"] = os.path.join(app.root_path, "jobs", "jobs.sqlite3")
+app.config["JOB_WORKERS"] = 2
+app.config["JOB_MAX_AGE"] = 24 * 3600
+job_store = JobStore(app.config["JOB_DB"], fail_unfinished=True)
+job_queue = JobQueue(job_store, max_workers=app.config["JOB_WORKERS"])
+
+# Finished solutions are kept in a compact store; the session only carries the
+# solution id. Solutions unused for SOLUTION_MAX_AGE seconds are purged.
+app.config["SOLUTION_DB"] = os.path.join(app.root_path, "solutions", "solutions.sqlite3")
+app.config["SOLUTION_MAX_AGE"] = 24 * 3600
+solution_store = SolutionStore(app.config["SOLUTION_DB"])
+
+# Every request records its stage timings and counters (scheduler.metrics) into
+# request_log; /metrics shows them together with those of the background jobs.
+# With PROFILING on, ?profile=1 also runs that request (and the job it starts)
+# under cProfile and dumps the stats into PROFILE_DIR.
+app.config["PROFILING"] = False
+app.config["PROFILE_DIR"] = os.path.join(app.root_path, "profiles")
+app.config["METRICS_IGNORE_ENDPOINTS"] = {"static", "metrics", "job_status"}
+request_log = MetricsLog(max_entries=200)
+
+def _profiling_requested():
+    return app.config["PROFILING"] and request.args.get("profile") == "1"
+
+@app.before_request
+def start_request_metrics():
+    """Start recording (and optionally profiling) the current request."""
+    g.metrics_start = time.perf_counter()
+    g.metrics_recorder = Recorder()
+    g.metrics_stack = ExitStack()
+    g.metrics_stack.enter_context(recording(g.metrics_recorder))
+    if _profiling_requested():
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{request.endpoint}-{uuid.uuid4().hex[:8]}.prof"
+        g.metrics_stack.enter_context(profiled(os.path.join(app.config["PROFILE_DIR"], name)))
+
+@app.after_request
+def note_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    """Stop recording and add the request to request_log."""
+    stack = g.pop("metrics_stack", None)
+    if stack is None:
+        return
+    stack.close()
+    if request.endpoint in app.config["METRICS_IGNORE_ENDPOINTS"]:
+        return
+    request_log.add(dict(
+        g.metrics_recorder.as_dict(),
+        method=request.method,
+        path=request.path,
+        endpoint=request.endpoint,
+        status=g.get("metrics_status", 500),
+        seconds=time.perf_counter() - g.metrics_start,
+        time=datetime.now().isoformat(timespec="seconds"),
+    ))
+
+# Calendar months are rendered on first request by /calendar and cached per
+# (solution, month). "png" draws them with matplotlib, "svg" with the
+# lightweight renderer that skips matplotlib.
+app.config["CALENDAR_FORMAT"] = "png"
+# Rows per page of the conflict table on /force, and per chunk written to the
+# export's "Conflicts" sheet.
+app.config["CONFLICTS_PER_PAGE"] = 200
+app.config["EXPORT_CHUNK_ROWS"] = 10000
+
+calendar_cache = LRUCache(max_entries=64, directory=os.path.join(app.config["CACHE_DIR"], "calendars"),
+                          max_disk_entries=1024)
+
 @app.route("/")
 def landing():
     """Render the landing page."""
@@ -49,13 +168,11 @@ def schedule_page():
 def schedule_post():
     """
     Process the scheduling form:
-      - Parse the Excel file and input dates.
-      - Run scheduling via schedule_exams_with_options().
-      - Store the extended solution in session for the user to see by default.
-      - Store conflict-minimized (forced) solution + conflict details in session,
-        but do NOT show them yet in the result page.
-      - If we had to extend beyond last_date, set extended_warning = True.
-      - The user can later click "Force Schedule Within Range" to see conflict details.
+      - Parse the input dates and options.
+      - Save the uploaded registrations (Excel, CSV or Parquet) and submit a
+        background job that parses and schedules (run_schedule_job).
+      - Redirect straight to the job page, which polls for progress and then
+        shows the result (job_result).
     """
     if "file" not in request.files:
         flash("No file part provided.", "error")
@@ -96,59 +213,271 @@ def schedule_post():
                 flash(f"Error parsing fixed schedule pair: {pair}. Format: EX_ID=YYYY-MM-DD.", "error")
                 return redirect(url_for("schedule_page"))
     
-    # Read the Excel file
-    try:
-        data = read_and_analyze_data(file)
-    except Exception:
-        flash("Error reading Excel file. Ensure it's a valid Excel file.", "error")
+    strategy = request.form.get("strategy", "largest_first")
+    if strategy not in STRATEGIES:
+        flash(f"Unknown ordering strategy: {strategy}", "error")
+        return redirect(url_for("schedule_page"))
+    solver = request.form.get("solver", "greedy")
+    if solver not in ("greedy", "exact", "portfolio"):
+        flash(f"Unknown solver: {solver}", "error")
+        return redirect(url_for("schedule_page"))
+    
+    # Sessions per day and rooms ("Hall A=200, Room 2=40", seats per session).
+    slots_per_day = request.form.get("slots_per_day", 1, type=int)
+    if slots_per_day not in (1, 2, 3):
+        flash("Sessions per day must be 1, 2 or 3.", "error")
+        return redirect(url_for("schedule_page"))
+    rooms_str = request.form.get("rooms", "").strip()
+    rooms = {}
+    if rooms_str:
+        for pair in rooms_str.split(","):
+            try:
+                room, seats = pair.split("=")
+                rooms[room.strip()] = int(seats)
+            except Exception:
+                flash(f"Error parsing room: {pair}. Format: ROOM=SEATS.", "error")
+                return redirect(url_for("schedule_page"))
+            if rooms[room.strip()] <= 0:
+                flash(f"Room {room.strip()} must have at least one seat.", "error")
+                return redirect(url_for("schedule_page"))
+    if solver == "exact" and (slots_per_day > 1 or rooms):
+        flash("The exact solver schedules whole days: use one session per day and no rooms.", "error")
+        return redirect(url_for("schedule_page"))
+    spread_load = request.form.get("spread_load") == "on"
+    if solver == "exact" and spread_load:
+        flash("The exact solver does not spread student load: use the fast solver.", "error")
         return redirect(url_for("schedule_page"))
     
-    # Run scheduling with multiple solutions
-    solutions = schedule_exams_with_options(data, first_date, last_date, excluded_dates, fixed_schedules)
+    # Hand the upload to a background worker; keep the original extension so the
+    # reader can tell Excel, CSV and Parquet apart.
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    fd, upload_path = tempfile.mkstemp(dir=app.config["UPLOAD_FOLDER"],
+                                       suffix=os.path.splitext(file.filename)[1].lower())
+    with os.fdopen(fd, "wb") as f:
+        file.save(f)
+    params = {
+        "first_date": first_date,
+        "last_date": last_date,
+        "excluded_dates": excluded_dates,
+        "fixed_schedules": fixed_schedules,
+        "strategy": strategy,
+        "improve_seconds": app.config["IMPROVE_SECONDS"],
+        "solver": solver,
+        "exact_time_limit": app.config["EXACT_TIME_LIMIT"],
+        "portfolio_runs": app.config["PORTFOLIO_RUNS"],
+        "slots_per_day": slots_per_day,
+        "rooms": rooms,
+        "soft_constraints": app.config["SOFT_CONSTRAINTS"] if spread_load else None,
+    }
+    job_store.purge(app.config["JOB_MAX_AGE"])
+    solution_store.purge(app.config["SOLUTION_MAX_AGE"])
+    job_id = job_queue.submit(run_schedule_job, os.path.abspath(upload_path), params,
+                              profile_dir=app.config["PROFILE_DIR"] if _profiling_requested() else None)
+    return redirect(url_for("job_page", job_id=job_id))
+
+def run_schedule_job(store, job_id, upload_path, params):
+    """
+    Background part of a /schedule submission, run in a worker process:
+      - parse: read the upload (or reuse the cached index for the same file),
+      - solve: schedule_exams_with_options() (or schedule_exams_portfolio() /
+        schedule_exams_exact() for the portfolio and exact solvers) + conflict
+        details (or cached), saved to the solution store.
+    Returns the solution id plus the data the result page needs on top of it.
+    """
+    first_date, last_date = params["first_date"], params["last_date"]
+    excluded_dates, fixed_schedules = params["excluded_dates"], params["fixed_schedules"]
+    
+    store.set_stage(job_id, "parse")
+    try:
+        # Reuse the parsed upload if this exact file has been seen before.
+        digest = file_digest(upload_path)
+        index = index_cache.get(digest)
+        if index is not None:
+            count("index_cache_hits")
+        else:
+            try:
+                data = read_and_analyze_data(upload_path)
+            except Exception:
+                raise ValueError("Error reading file. Ensure it's a valid Excel, CSV or Parquet file "
+                                 "with Student ID, Exam ID and Course Name columns.")
+            # Build the exam/student lookups once; both the scheduler and the
+            # conflict details reuse them.
+            with stage("index"):
+                index = build_enrollment_index(data)
+    finally:
+        os.remove(upload_path)
+    
+    # Run scheduling with multiple solutions, unless the same file and parameters
+    # were solved before.
+    store.set_stage(job_id, "solve")
+    key = solution_key(digest, first_date, last_date, excluded_dates, fixed_schedules,
+                       strategy=params["strategy"], improve_seconds=params["improve_seconds"],
+                       solver=params["solver"],
+                       exact_time_limit=params["exact_time_limit"] if params["solver"] == "exact" else None,
+                       portfolio_runs=params["portfolio_runs"] if params["solver"] == "portfolio" else None,
+                       slots_per_day=params["slots_per_day"], rooms=sorted(params["rooms"].items()),
+                       soft_constraints=sorted((params["soft_constraints"] or {}).items()))
+    cached = solution_cache.get(key)
+    if cached is None:
+        if params["solver"] == "exact":
+            solutions = schedule_exams_exact(index, first_date, last_date, excluded_dates, fixed_schedules,
+                                             time_limit=params["exact_time_limit"],
+                                             strategy=params["strategy"],
+                                             improve_seconds=params["improve_seconds"])
+        elif params["solver"] == "portfolio":
+            solutions = schedule_exams_portfolio(index, first_date, last_date, excluded_dates,
+                                                 fixed_schedules, num_runs=params["portfolio_runs"],
+                                                 improve_seconds=params["improve_seconds"],
+                                                 slots_per_day=params["slots_per_day"],
+                                                 rooms=params["rooms"],
+                                                 soft_constraints=params["soft_constraints"])
+        else:
+            solutions = schedule_exams_with_options(index, first_date, last_date, excluded_dates,
+                                                    fixed_schedules, strategy=params["strategy"],
+                                                    improve_seconds=params["improve_seconds"],
+                                                    slots_per_day=params["slots_per_day"],
+                                                    rooms=params["rooms"],
+                                                    soft_constraints=params["soft_constraints"])
+        # Compute conflict details for forced solution
+        forced = solutions["conflict_solution"]
+        conflict_details = compute_conflict_details(index, forced["schedule"])
+        # ... the student load of both, if the solver did not score it ...
+        for solution in (solutions["extended_solution"], forced):
+            if solution["student_load"] is None:
+                solution["student_load"] = compute_student_load_summary(index, solution["schedule"],
+                                                                        params["soft_constraints"])
+        # ... and the students with a heavy load in the extended solution
+        load_details = compute_student_load_details(index, solutions["extended_solution"]["schedule"],
+                                                    params["soft_constraints"])
+        solution_cache.set(key, (solutions, conflict_details, load_details))
+        # Stored after solving so the cached copy includes the conflict graph.
+        index_cache.set(digest, index)
+    else:
+        count("solution_cache_hits")
+        solutions, conflict_details, load_details = cached
     
     # 1) Extended solution: used by default
-    ext_sched = solutions["extended_solution"]["final_schedule"]
+    ext_sched = solutions["extended_solution"]["schedule"]
     extended_last_dt = solutions["extended_solution"]["extended_last_date"]
     
-    # Convert extended solution to str-based date for the template.
-    extended_solution_str = [
-        (d.strftime("%Y-%m-%d"), exam, course, count) for d, exam, course, count in ext_sched
-    ]
-    extended_warning = (extended_last_dt > last_date) and not solutions["normal_complete"]
-    if extended_warning:
-        flash(f"Not all exams could be scheduled conflict-free by {last_date.strftime('%Y-%m-%d')}. "
-              f"The schedule extends to {extended_last_dt.strftime('%Y-%m-%d')}.", "info")
-    
-    # 2) Conflict-minimized solution: stored in session but not displayed yet
-    force_sched = solutions["conflict_solution"]["final_schedule"]
-    force_sched_str = [
-        (d.strftime("%Y-%m-%d"), exam, course, count) for d, exam, course, count in force_sched
-    ]
-    # Compute conflict details for forced solution
-    conflict_details = compute_conflict_details(data, solutions["conflict_solution"]["exam_dates"])
-    
-    # Store forced solution data in session
-    session['conflict_solution'] = json.dumps(force_sched_str)
-    session['conflict_details'] = json.dumps(conflict_details)
-    session['force_stats'] = json.dumps({
+    # 2) Conflict-minimized solution: stored but not displayed yet
+    force_sched = solutions["conflict_solution"]["schedule"]
+    
+    # Stored under a hash of the schedules as well as of the run, because a run
+    # is not deterministic (tabu search and CP-SAT stop on the clock): once the
+    # cached solutions are gone, the same submission may give other schedules,
+    # and calendars cached for the old id must not be served for them.
+    solution_id = hashlib.sha256(f"{key}|{ext_sched.digest()}|{force_sched.digest()}".encode("utf-8")).hexdigest()
+    # Rows with str-based dates and session names for the templates and the
+    # export, plus the schedules themselves for the calendars.
+    solution_store.save(solution_id, {
+        "extended_solution": ext_sched.string_rows(index),
+        "conflict_solution": force_sched.string_rows(index),
+        "extended_schedule": ext_sched,
+        "conflict_schedule": force_sched,
+        "conflict_details": conflict_details,
         "total_conflicts": solutions["conflict_solution"]["total_conflicts"],
-        "impacted_students": solutions["conflict_solution"]["impacted_students"]
+        "impacted_students": solutions["conflict_solution"]["impacted_students"],
+        "load_details": load_details,
+        **{f"{which}_{name}": value
+           for which in ("extended", "conflict")
+           for name, value in solutions[f"{which}_solution"]["student_load"].items()},
     })
     
-    # 3) The chosen solution is extended by default
-    session['chosen_solution'] = json.dumps(extended_solution_str)
+    return {
+        "solution_id": solution_id,
+        "extended_warning": (extended_last_dt > last_date) and not solutions["normal_complete"],
+        "last_date": last_date.strftime("%Y-%m-%d"),
+        "extended_last_date": extended_last_dt.strftime("%Y-%m-%d") if extended_last_dt else "",
+        "exact": solutions.get("exact"),
+    }
+
+@app.route("/jobs/<job_id>")
+def job_page(job_id):
+    """Render a page that polls the job's status and opens the result when ready."""
+    if job_store.status(job_id) is None:
+        flash("Unknown scheduling job.", "error")
+        return redirect(url_for("schedule_page"))
+    return render_template("job.html", job_id=job_id)
+
+@app.route("/jobs/<job_id>/status")
+def job_status(job_id):
+    """Return the job's status, stage (parse/solve) and progress as JSON."""
+    status = job_store.status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    status["result_url"] = url_for("job_result", job_id=job_id) if status["status"] == "done" else None
+    return jsonify(status)
+
+def _load_summary(solution, which):
+    """One-line student load description of a stored solution ("extended" or "conflict")."""
+    if f"{which}_penalty" not in solution:
+        return ""
+    return (f"Student load: {solution[f'{which}_back_to_back']} back-to-back exam days and "
+            f"{solution[f'{which}_window_excess']} exams over the limit of "
+            f"{app.config['SOFT_CONSTRAINTS']['max_exams']} in "
+            f"{app.config['SOFT_CONSTRAINTS']['window_days']} days, "
+            f"affecting {solution[f'{which}_penalized_students']} students.")
+
+def _exact_summary(objective, info):
+    """One-line description of an exact solver objective for the result page."""
+    what = {"span": "Exam days (conflict-free)", "conflicts": "Conflicts within range"}[objective]
+    if info["status"] == "OPTIMAL":
+        return f"{what}: {info['objective']}, proven optimal."
+    if info["gap"] is None:
+        return f"{what}: the exact solver found no solution in time; the greedy schedule is shown."
+    return (f"{what}: {info['objective']}, best bound {info['best_bound']} "
+            f"(optimality gap {info['gap']:.0%}, time limit reached).")
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    """
+    Show the result of a finished scheduling job:
+      - Show the extended solution by default.
+      - Keep only the solution id in session; the conflict-minimized (forced)
+        solution + conflict details stay in the solution store and are NOT
+        shown yet in the result page.
+      - If we had to extend beyond last_date, show a warning.
+      - The user can later click "Force Schedule Within Range" to see conflict details.
+    """
+    status = job_store.status(job_id)
+    if status is None:
+        flash("Unknown scheduling job.", "error")
+        return redirect(url_for("schedule_page"))
+    if status["status"] == "failed":
+        flash(status["error"], "error")
+        return redirect(url_for("schedule_page"))
+    if status["status"] != "done":
+        return redirect(url_for("job_page", job_id=job_id))
+    result = job_store.result(job_id)
+    solution = solution_store.load(result["solution_id"], tables=("extended_solution",))
+    if solution is None:
+        flash("This schedule has expired. Please run the scheduler again.", "error")
+        return redirect(url_for("schedule_page"))
+    
+    if result["extended_warning"]:
+        flash(f"Not all exams could be scheduled conflict-free by {result['last_date']}. "
+              f"The schedule extends to {result['extended_last_date']}.", "info")
+    
+    # /force and /export look the solutions up by this id
+    session['solution_id'] = result["solution_id"]
     
-    # Generate calendar images for extended solution
-    calendar_images = generate_calendar_images(solutions["extended_solution"]["exam_dates"])
     month_names = {i: calendar.month_name[i] for i in range(1, 13)}
     
     return render_template(
         "result.html",
-        schedule=extended_solution_str,
-        calendar_images=calendar_images,
+        schedule=solution["extended_solution"],
+        show_sessions=_has_sessions(solution["extended_schedule"]),
+        solution_id=result["solution_id"],
+        calendar_solution="extended",
+        calendar_months=calendar_months(solution["extended_schedule"]),
+        calendar_format=app.config["CALENDAR_FORMAT"],
         months=month_names,
-        extended_warning=extended_warning,
-        extended_last_date=extended_last_dt.strftime("%Y-%m-%d") if extended_last_dt else "",
+        extended_warning=result["extended_warning"],
+        extended_last_date=result["extended_last_date"],
+        exact_summaries=[_exact_summary(objective, info)
+                         for objective, info in (result.get("exact") or {}).items()],
+        load_summary=_load_summary(solution, "extended"),
         
         # We do not pass conflict_details or forced stats here
         # since the user hasn't forced scheduling yet
@@ -161,74 +490,152 @@ def force_solution():
     """
     Show the forced schedule with conflict-minimized logic.
     Display a table summarizing how many conflicts, as well as
-    a table of conflict details for each student.
+    a table of conflict details for each student, CONFLICTS_PER_PAGE rows per
+    page (?page=N).
     """
-    final_schedule_json = session.get("conflict_solution")
-    if not final_schedule_json:
+    solution_id = session.get("solution_id")
+    packed = solution_store.load_packed(solution_id) if solution_id else None
+    if packed is None:
         flash("No conflict-minimized schedule available.", "error")
         return redirect(url_for("schedule_page"))
     
-    final_schedule = json.loads(final_schedule_json)  # (date_str, exam, course, count)
+    # The conflict details are decoded one page at a time.
+    solution = unpack_solution(packed, tables=("conflict_solution",))
+    final_schedule = solution["conflict_solution"]  # (date_str, exam, course, count, session, rooms)
     flash("Forced schedule within the requested range applied. Conflicts may occur.", "warning")
     
-    # Retrieve conflict details + stats
-    conflict_details_json = session.get("conflict_details")
-    force_stats_json = session.get("force_stats")
-    if not conflict_details_json or not force_stats_json:
-        # No conflict data => error
-        flash("No conflict data found in session.", "error")
-        return redirect(url_for("schedule_page"))
-    
-    conflict_details = json.loads(conflict_details_json)  # list of (student, date, "EX1, EX2...")
-    force_stats = json.loads(force_stats_json)  # {"total_conflicts": int, "impacted_students": int}
+    conflict_total = count_solution_rows(packed, "conflict_details")
+    per_page = app.config["CONFLICTS_PER_PAGE"]
+    num_pages = max(1, -(-conflict_total // per_page))
+    page = min(max(request.args.get("page", 1, type=int), 1), num_pages)
+    # list of (student, date, "EX1, EX2...")
+    conflict_details = solution_rows(packed, "conflict_details", (page - 1) * per_page, page * per_page)
     
-    # No calendar images for forced solution in this example
-    calendar_images = {}
     month_names = {i: calendar.month_name[i] for i in range(1, 13)}
     
     # forced_mode = True => show conflict table + summary
     return render_template(
         "result.html", 
         schedule=final_schedule,
-        calendar_images=calendar_images,
+        show_sessions=_has_sessions(solution["conflict_schedule"]),
+        solution_id=solution_id,
+        calendar_solution="conflict",
+        calendar_months=calendar_months(solution["conflict_schedule"]),
+        calendar_format=app.config["CALENDAR_FORMAT"],
         months=month_names,
         extended_warning=False,     # No extended scheduling here
         extended_last_date="",      # Not relevant in forced mode
         conflict_details=conflict_details,
+        conflict_total=conflict_total,
+        conflict_offset=(page - 1) * per_page,
+        page=page,
+        num_pages=num_pages,
         forced_mode=True,
-        total_conflicts=force_stats["total_conflicts"],
-        impacted_students=force_stats["impacted_students"]
+        load_summary=_load_summary(solution, "conflict"),
+        total_conflicts=solution["total_conflicts"],
+        impacted_students=solution["impacted_students"]
     )
 
+def _has_sessions(schedule):
+    """True if a Schedule uses several sessions a day or rooms (shown as extra columns)."""
+    return schedule.slots_per_day > 1 or bool(schedule.rooms)
+
+@app.route("/calendar/<solution_id>/<which>/<int:year>-<int:month>.<fmt>")
+def calendar_month(solution_id, which, year, month, fmt):
+    """
+    Serve one calendar month of a stored solution ("extended" or "conflict")
+    as PNG or SVG. Each (solution, month, format) is rendered at most once and
+    then served from calendar_cache.
+    """
+    if which not in ("extended", "conflict") or fmt not in ("png", "svg") \
+            or not re.fullmatch(r"[0-9a-f]+", solution_id):
+        abort(404)
+    key = f"{solution_id}-{which}-{year}-{month:02d}-{fmt}"
+    image = calendar_cache.get(key)
+    if image is None:
+        # Only the schedule's arrays are decoded, not the stored row tables.
+        packed = solution_store.load_packed(solution_id)
+        schedule = load_schedule(packed, f"{which}_schedule") if packed is not None else None
+        if schedule is None:
+            abort(404)
+        if (year, month) not in calendar_months(schedule):
+            abort(404)
+        if fmt == "png":
+            image = render_calendar_png(schedule, year, month)
+        else:
+            image = render_calendar_svg(schedule, year, month).encode("utf-8")
+        calendar_cache.set(key, image)
+    response = Response(image, mimetype="image/png" if fmt == "png" else "image/svg+xml")
+    # Solution ids are content-addressed (see run_schedule_job): an id always
+    # maps to the same schedules, so browsers may keep the image.
+    response.cache_control.max_age = 24 * 3600
+    return response
+
+# Sheets/tables of an export: (stored table, sheet name, header row).
+EXPORT_TABLES = {
+    "schedule": ("extended_solution", "Exam Schedule",
+                 ["Scheduled Date", "Exam ID", "Course", "# of Students", "Session", "Rooms"]),
+    "conflicts": ("conflict_details", "Conflicts", ["Student ID", "Date", "Exams"]),
+    "load": ("load_details", "Student Load", ["Student ID", "Back-to-Back Days", "Exams Over Limit", "Penalty"]),
+}
+
 @app.route("/export")
 def export_schedule():
     """
-    Generate an Excel file with two sheets:
-      - "Exam Schedule": the chosen solution (extended or forced).
-      - "Conflicts": if forced mode was used, a table of conflicts.
+    Stream the chosen (extended) solution straight from the solution store.
+    Default (?format=xlsx): an Excel file with two sheets:
+      - "Exam Schedule": the chosen solution.
+      - "Conflicts": the conflicts of the forced solution, if there are any.
+      - "Student Load": students with back-to-back or crowded exam days in
+        the chosen solution, if there are any.
+    ?format=csv&table=schedule|conflicts|load: one of those tables as CSV.
+    Rows are decoded and written EXPORT_CHUNK_ROWS at a time, so memory use does
+    not grow with the number of conflicts.
     """
-    final_schedule_json = session.get("chosen_solution")
-    if not final_schedule_json:
+    solution_id = session.get("solution_id")
+    packed = solution_store.load_packed(solution_id) if solution_id else None
+    if packed is None:
         flash("No schedule available to export.", "error")
         return redirect(url_for("schedule_page"))
+    chunk_rows = app.config["EXPORT_CHUNK_ROWS"]
     
-    final_schedule = json.loads(final_schedule_json)
-    
-    # If conflict_details exist in session, we can also export them
-    conflict_details_json = session.get("conflict_details")
-    conflict_details = []
-    if conflict_details_json:
-        conflict_details = json.loads(conflict_details_json)
-    
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df_schedule = pd.DataFrame(final_schedule, columns=["Scheduled Date", "Exam ID", "Course", "# of Students"])
-        df_schedule.to_excel(writer, index=False, sheet_name="Exam Schedule")
+    if request.args.get("format", "xlsx") == "csv":
+        table = request.args.get("table", "schedule")
+        if table not in EXPORT_TABLES:
+            abort(404)
+        name, sheet, header = EXPORT_TABLES[table]
+        
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(header)
+            for chunk in iter_solution_rows(packed, name, chunk_rows):
+                writer.writerows(chunk)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
         
-        if conflict_details:
-            df_conflicts = pd.DataFrame(conflict_details, columns=["Student ID", "Date", "Exams"])
-            df_conflicts.to_excel(writer, index=False, sheet_name="Conflicts")
+        return Response(generate(), mimetype="text/csv", headers={
+            "Content-Disposition": f"attachment; filename=exam_{table}.csv"})
     
+    # A write-only workbook keeps only the current row in memory and spools the
+    # sheets to disk; the finished file is sent in chunks and then deleted.
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for table, (name, sheet, header) in EXPORT_TABLES.items():
+        chunks = iter_solution_rows(packed, name, chunk_rows)
+        first_chunk = next(chunks, [])
+        if table != "schedule" and not first_chunk:
+            # The Conflicts / Student Load sheets are only added when not empty
+            continue
+        worksheet = workbook.create_sheet(sheet)
+        worksheet.append(header)
+        for chunk in chain([first_chunk], chunks):
+            for row in chunk:
+                worksheet.append(row)
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
     output.seek(0)
     return send_file(
         output,
@@ -237,6 +644,20 @@ def export_schedule():
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
+@app.route("/metrics")
+def metrics():
+    """
+    Return the recorded stage timings and counters as JSON: the most recent
+    web requests and background jobs (newest first) plus per-stage totals.
+    """
+    web_requests = request_log.entries()[::-1]
+    jobs = job_store.recent_metrics(limit=50)
+    return jsonify({
+        "requests": web_requests,
+        "jobs": jobs,
+        "summary": {"requests": summarize(web_requests), "jobs": summarize(jobs)},
+    })
+
 @app.route("/about")
 def about():
     return render_template("about.html")